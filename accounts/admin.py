@@ -146,18 +146,18 @@ class ShippingAddressAdmin(admin.ModelAdmin):
 
 @admin.register(InvoiceDetails)
 class InvoiceDetailsAdmin(admin.ModelAdmin):
-    list_display = ('full_name_or_company', 'user', 'vat_id', 'city', 'postal_code', 'created_at')
-    list_filter = ('city', 'created_at')
+    list_display = ('full_name_or_company', 'user', 'vat_id', 'vat_status', 'city', 'postal_code', 'created_at')
+    list_filter = ('vat_status', 'city', 'created_at')
     search_fields = ('full_name_or_company', 'user__email', 'vat_id', 'street', 'city')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'vat_status', 'vat_checked_at')
     
     fieldsets = (
         (_('Basic Information'), {
             'fields': ('user', 'full_name_or_company')
         }),
         (_('Tax Information'), {
-            'fields': ('vat_id',),
+            'fields': ('vat_id', 'vat_status', 'vat_checked_at'),
             'description': _('Enter VAT ID if this is a company purchase')
         }),
         (_('Address'), {
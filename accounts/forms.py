@@ -5,18 +5,13 @@ from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from .models import ShippingAddress, InvoiceDetails
 
-# Import Turnstile field
-# Conditional import for Turnstile
-try:
-    from turnstile.fields import TurnstileField
-    TURNSTILE_AVAILABLE = True
-except ImportError:
-    TURNSTILE_AVAILABLE = False
-    TurnstileField = None
+# Turnstile field (available when django-turnstile is installed)
+from .turnstile import TurnstileField, TurnstileFormMixin
+TURNSTILE_AVAILABLE = TurnstileField is not None
 
 User = get_user_model()
 
-class CustomUserCreationForm(UserCreationForm):
+class CustomUserCreationForm(TurnstileFormMixin, UserCreationForm):
     email = forms.EmailField(
         required=True,
         widget=forms.EmailInput(attrs={'class': 'form-control', 'placeholder': _('Enter your email')})
@@ -32,12 +27,11 @@ class CustomUserCreationForm(UserCreationForm):
         model = User
         fields = ('email', 'newsletter_opt_in', 'password1', 'password2')
         
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request=None, **kwargs):
         super().__init__(*args, **kwargs)
         
         # Add Turnstile field only if available
-        if TURNSTILE_AVAILABLE:
-            self.fields['turnstile'] = TurnstileField()
+        self.add_turnstile_field(request)
         
         # Remove username field if it exists
         if 'username' in self.fields:
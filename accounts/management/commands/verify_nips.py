@@ -0,0 +1,80 @@
+"""
+Django management command verifying NIPs against the MF white-list API.
+
+Usage:
+python manage.py verify_nips
+python manage.py verify_nips --older-than 30
+python manage.py verify_nips --workers 2 --batch-size 500
+python manage.py verify_nips --file nips.txt
+python manage.py verify_nips --nip 5252651120 --nip 7010144598
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from accounts.models import InvoiceDetails
+from accounts.nip_lookup import verify_invoice_details, verify_nips
+
+
+class Command(BaseCommand):
+    help = 'Verify NIPs (InvoiceDetails VAT IDs by default) against the MF API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nip',
+            action='append',
+            dest='nips',
+            help='Verify this NIP only (repeatable); nothing is saved'
+        )
+        parser.add_argument(
+            '--file',
+            help='Verify NIPs listed one per line in this file; nothing is saved'
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help='Only re-verify invoice details not checked in this many days'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Invoice details processed per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent MF API requests (default: NIP_LOOKUP_WORKERS)'
+        )
+
+    def handle(self, *args, **options):
+        nips = list(options['nips'] or [])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                nips.extend(line.strip() for line in f if line.strip())
+
+        if nips:
+            results = verify_nips(nips, workers=options['workers'])
+            for nip, status in results.items():
+                self.stdout.write(f'{nip}: {status}')
+            summary = {}
+            for status in results.values():
+                summary[status] = summary.get(status, 0) + 1
+        else:
+            queryset = InvoiceDetails.objects.exclude(vat_id='')
+            if options['older_than'] is not None:
+                cutoff = timezone.now() - timedelta(days=options['older_than'])
+                queryset = queryset.filter(Q(vat_checked_at__isnull=True) | Q(vat_checked_at__lt=cutoff))
+            summary = verify_invoice_details(
+                queryset,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+            )
+
+        total = sum(summary.values())
+        details = ', '.join(f'{status}: {count}' for status, count in sorted(summary.items()))
+        self.stdout.write(self.style.SUCCESS(f'Verified {total} NIP(s) ({details or "none"})'))
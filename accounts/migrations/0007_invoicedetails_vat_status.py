@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_remove_default_functionality'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoicedetails',
+            name='vat_status',
+            field=models.CharField(choices=[('unverified', 'Unverified'), ('active', 'Active VAT payer'), ('not_found', 'Not found / inactive'), ('invalid', 'Invalid checksum')], default='unverified', max_length=20, verbose_name='VAT status'),
+        ),
+        migrations.AddField(
+            model_name='invoicedetails',
+            name='vat_checked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='VAT status checked at'),
+        ),
+    ]
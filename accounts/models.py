@@ -151,6 +151,13 @@ class ShippingAddress(models.Model):
         super().save(*args, **kwargs)
 
 class InvoiceDetails(models.Model):
+    VAT_STATUS_CHOICES = [
+        ('unverified', _('Unverified')),
+        ('active', _('Active VAT payer')),
+        ('not_found', _('Not found / inactive')),
+        ('invalid', _('Invalid checksum')),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -173,6 +180,13 @@ class InvoiceDetails(models.Model):
         help_text=_('Format: XX-XXX')
     )
     city = models.CharField(_('city'), max_length=100)
+    vat_status = models.CharField(
+        _('VAT status'),
+        max_length=20,
+        choices=VAT_STATUS_CHOICES,
+        default='unverified'
+    )
+    vat_checked_at = models.DateTimeField(_('VAT status checked at'), null=True, blank=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
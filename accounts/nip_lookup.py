@@ -0,0 +1,450 @@
+"""
+NIP lookups against the Ministry of Finance white-list API (wl-api.mf.gov.pl).
+
+Results are cached (found and not-found answers with separate TTLs),
+concurrent lookups of the same NIP share one upstream call, and a circuit
+breaker stops calling the API for a while after repeated failures or slow
+responses, so callers fall back to checksum-only answers immediately.
+Upstream requests reuse pooled keep-alive connections.
+
+The API address is configurable (MF_API_URL), e.g. to point it at a local
+fake server in tests.
+"""
+
+import http.client
+import json
+import logging
+import queue
+import re
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+NIP_CACHE_PREFIX = 'nip_lookup:'
+
+# The MF API accepts at most 30 NIPs per multi-NIP search
+MULTI_NIP_BATCH_SIZE = 30
+
+
+class UpstreamError(Exception):
+    """The MF API could not give an answer (timeout, connection or 5xx error)."""
+
+
+class KeepAliveHTTPClient:
+    """Small pool of persistent HTTP(S) connections to one host."""
+
+    def __init__(self, base_url, timeout=3.0, pool_size=4):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+        self.ssl_context = ssl.create_default_context() if self.scheme == 'https' else None
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=self.ssl_context
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _release(self, connection):
+        try:
+            self.pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def request_json(self, method, path, body=None, headers=None):
+        """Send a request to base_url + path; returns (status, parsed JSON or None)."""
+        headers = {
+            'Accept': 'application/json',
+            'User-Agent': 'misamisa.pl',
+            'Connection': 'keep-alive',
+            **(headers or {}),
+        }
+        for attempt in range(2):
+            connection = self._acquire()
+            try:
+                connection.request(method, self.base_path + path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Pooled connection was closed by the server - retry on a fresh one
+                connection.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            try:
+                data = json.loads(payload.decode('utf-8')) if payload else None
+            except ValueError:
+                data = None
+            return response.status, data
+
+    def get_json(self, path):
+        return self.request_json('GET', path)
+
+    def post_form(self, path, data):
+        return self.request_json(
+            'POST', path, body=urlencode(data),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        )
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then a single trial call decides whether it closes.
+    """
+
+    def __init__(self, threshold=3, reset_timeout=60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("MF API circuit opened after %s failures", self.failures)
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+def parse_address(address):
+    """Split an MF API address ("STREET NUMBER, 00-000 CITY") into form fields."""
+    parsed = {}
+    postal_city_match = re.search(r'(\d{2}-\d{3})\s+([^,]+?)(?:,|$)', address)
+    if postal_city_match:
+        parsed['postal_code'] = postal_city_match.group(1)
+        parsed['city'] = postal_city_match.group(2).strip()
+
+    street_match = (
+        re.search(r'^(.+?)(?=\s*,\s*\d{2}-\d{3})', address)
+        or re.search(r'^(.+?)(?=\s+\d{2}-\d{3})', address)
+    )
+    street = street_match.group(1) if street_match else re.split(r'\s*\d{2}-\d{3}', address)[0]
+    street = re.sub(r'^(ul\.|al\.|pl\.|os\.)\s*', '', street.strip(), flags=re.IGNORECASE)
+    street = street.rstrip(',').strip()
+    if street:
+        parsed['street'] = street
+    return parsed
+
+
+def parse_subject(subject):
+    """
+    Turn an MF API subject into the lookup result:
+    {'found': True, 'data': {...}} for active VAT payers, otherwise {'found': False}.
+    """
+    if not subject or subject.get('statusVat') != 'Czynny':
+        return {'found': False}
+
+    working_address = subject.get('workingAddress') or ''
+    residence_address = subject.get('residenceAddress') or ''
+    registered_address = subject.get('registeredAddress') or ''
+    company_data = {
+        'name': subject.get('name', 'N/A'),
+        'working_address': working_address,
+        'residence_address': residence_address,
+        'registered_address': registered_address,
+        'parsed_from': (
+            'working_address' if working_address else
+            'residence_address' if residence_address else
+            'registered_address' if registered_address else 'none'
+        ),
+    }
+    address = (
+        working_address or residence_address or registered_address
+        or subject.get('adresZamieszkania') or subject.get('adresSiedziby') or subject.get('adres')
+    )
+    if address:
+        company_data.update(parse_address(address))
+    else:
+        company_data['address_note'] = 'no_address_available'
+    return {'found': True, 'data': company_data}
+
+
+class NipLookupService:
+    """Cached, coalesced and circuit-broken NIP lookups."""
+
+    def __init__(self, client=None, breaker=None):
+        self.client = client or KeepAliveHTTPClient(
+            getattr(settings, 'MF_API_URL', 'https://wl-api.mf.gov.pl'),
+            timeout=getattr(settings, 'NIP_LOOKUP_TIMEOUT', 3.0),
+            pool_size=getattr(settings, 'NIP_LOOKUP_POOL_SIZE', 4),
+        )
+        self.breaker = breaker or CircuitBreaker(
+            threshold=getattr(settings, 'NIP_LOOKUP_FAILURE_THRESHOLD', 3),
+            reset_timeout=getattr(settings, 'NIP_LOOKUP_RESET_TIMEOUT', 60),
+        )
+        # Responses slower than this count as failures for the breaker
+        self.slow_threshold = getattr(settings, 'NIP_LOOKUP_SLOW_THRESHOLD', 2.0)
+        self.positive_ttl = getattr(settings, 'NIP_CACHE_TTL', 60 * 60 * 24)
+        self.negative_ttl = getattr(settings, 'NIP_NEGATIVE_CACHE_TTL', 60 * 60)
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    # Cache
+
+    def cache_key(self, nip):
+        return f'{NIP_CACHE_PREFIX}{nip}'
+
+    def get_cached(self, nip):
+        return cache.get(self.cache_key(nip))
+
+    def get_cached_many(self, nips):
+        keys = {self.cache_key(nip): nip for nip in nips}
+        return {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+
+    def store(self, nip, result):
+        ttl = self.positive_ttl if result.get('found') else self.negative_ttl
+        cache.set(self.cache_key(nip), result, ttl)
+
+    def store_many(self, results):
+        positive = {self.cache_key(nip): r for nip, r in results.items() if r.get('found')}
+        negative = {self.cache_key(nip): r for nip, r in results.items() if not r.get('found')}
+        if positive:
+            cache.set_many(positive, self.positive_ttl)
+        if negative:
+            cache.set_many(negative, self.negative_ttl)
+
+    # Upstream
+
+    def call_upstream(self, path):
+        """GET from the MF API through the circuit breaker."""
+        if not self.breaker.allow():
+            raise UpstreamError('circuit open')
+        started = time.monotonic()
+        try:
+            status, data = self.client.get_json(path)
+        except (OSError, http.client.HTTPException) as e:
+            self.breaker.record_failure()
+            raise UpstreamError(str(e)) from e
+        if status >= 500 or status == 429:
+            self.breaker.record_failure()
+            raise UpstreamError(f'HTTP {status}')
+        if time.monotonic() - started > self.slow_threshold:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return status, data
+
+    def fetch(self, nip):
+        status, data = self.call_upstream(f'/api/search/nip/{nip}?date={date.today().isoformat()}')
+        if status == 404:
+            return {'found': False}
+        if status != 200 or not isinstance(data, dict):
+            raise UpstreamError(f'HTTP {status}')
+        return parse_subject((data.get('result') or {}).get('subject'))
+
+    def fetch_many(self, nips):
+        """One multi-NIP search; returns {nip: result} for every NIP asked."""
+        status, data = self.call_upstream(
+            f"/api/search/nips/{','.join(nips)}?date={date.today().isoformat()}"
+        )
+        if status == 404:
+            return {nip: {'found': False} for nip in nips}
+        if status != 200 or not isinstance(data, dict):
+            raise UpstreamError(f'HTTP {status}')
+        subjects = {}
+        for entry in (data.get('result') or {}).get('entries') or []:
+            for subject in entry.get('subjects') or []:
+                subjects[subject.get('nip') or entry.get('identifier')] = subject
+        return {nip: parse_subject(subjects.get(nip)) for nip in nips}
+
+    # Lookup
+
+    def lookup(self, nip):
+        """
+        Return {'found': True, 'data': {...}}, {'found': False}, or None when
+        the API can't be asked right now (callers fall back to the checksum).
+        """
+        result = self.get_cached(nip)
+        if result is not None:
+            return result
+
+        with self._lock:
+            call = self._calls.get(nip)
+            leader = call is None
+            if leader:
+                call = self._calls[nip] = _Call()
+
+        if not leader:
+            # Another thread is already asking for this NIP
+            call.event.wait(self.client.timeout * 2)
+            return call.result
+
+        try:
+            try:
+                call.result = self.fetch(nip)
+            except UpstreamError as e:
+                logger.info("NIP lookup for %s unavailable: %s", nip, e)
+                call.result = None
+            if call.result is not None:
+                self.store(nip, call.result)
+            return call.result
+        finally:
+            with self._lock:
+                self._calls.pop(nip, None)
+            call.event.set()
+
+    def lookup_many(self, nips, workers=None):
+        """
+        Look up many NIPs: cached answers first, the rest via multi-NIP searches
+        run `workers` at a time. Returns {nip: result or None}.
+        """
+        nips = list(dict.fromkeys(nips))
+        results = dict.fromkeys(nips)
+        results.update(self.get_cached_many(nips))
+        missing = [nip for nip in nips if results[nip] is None]
+        batches = [
+            missing[i:i + MULTI_NIP_BATCH_SIZE]
+            for i in range(0, len(missing), MULTI_NIP_BATCH_SIZE)
+        ]
+        if not batches:
+            return results
+
+        def fetch_batch(batch):
+            try:
+                return self.fetch_many(batch)
+            except UpstreamError as e:
+                logger.info("Bulk NIP lookup of %s NIPs unavailable: %s", len(batch), e)
+                return {}
+
+        workers = workers or getattr(settings, 'NIP_LOOKUP_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            for fetched in executor.map(fetch_batch, batches):
+                self.store_many(fetched)
+                results.update(fetched)
+        return results
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_nip_lookup_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = NipLookupService()
+    return _service
+
+
+def clean_nip(value):
+    return re.sub(r'[^\d]', '', value or '')
+
+
+def verify_nips(nips, workers=None):
+    """
+    Bulk-verify NIPs: checksum first, then cached / MF API answers.
+    Returns {cleaned nip: 'active' | 'not_found' | 'invalid' | 'unavailable'}.
+    """
+    from django.core.exceptions import ValidationError
+    from .models import validate_polish_nip
+
+    statuses = {}
+    to_lookup = []
+    for nip in dict.fromkeys(clean_nip(nip) for nip in nips):
+        try:
+            if not nip:
+                raise ValidationError('empty')
+            validate_polish_nip(nip)
+        except ValidationError:
+            statuses[nip] = 'invalid'
+            continue
+        to_lookup.append(nip)
+
+    for nip, result in get_nip_lookup_service().lookup_many(to_lookup, workers=workers).items():
+        if result is None:
+            statuses[nip] = 'unavailable'
+        else:
+            statuses[nip] = 'active' if result.get('found') else 'not_found'
+    return statuses
+
+
+def verify_invoice_details(queryset=None, batch_size=1000, workers=None):
+    """
+    Re-verify InvoiceDetails.vat_id values and store the outcome with bulk_update.
+    Rows whose NIP couldn't be checked keep their previous status.
+    Returns a {status: count} summary.
+    """
+    from django.utils import timezone
+    from .models import InvoiceDetails
+
+    if queryset is None:
+        queryset = InvoiceDetails.objects.exclude(vat_id='')
+    queryset = queryset.only('id', 'vat_id', 'vat_status', 'vat_checked_at').order_by('pk')
+
+    summary = {}
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1].pk
+        statuses = verify_nips([row.vat_id for row in rows], workers=workers)
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            status = statuses.get(clean_nip(row.vat_id), 'invalid')
+            summary[status] = summary.get(status, 0) + 1
+            if status == 'unavailable':
+                continue
+            row.vat_status = status
+            row.vat_checked_at = now
+            changed.append(row)
+        InvoiceDetails.objects.bulk_update(changed, ['vat_status', 'vat_checked_at'])
+    return summary
@@ -0,0 +1,248 @@
+"""
+Cloudflare Turnstile verification for the auth forms.
+
+Tokens are verified over pooled keep-alive connections with a strict
+timeout (TURNSTILE_TIMEOUT). Verified tokens are cached for a short while
+(TURNSTILE_CACHE_TTL) so re-rendering a form with other errors doesn't
+verify - and burn - the single-use token again within one validation. A
+cache entry is bound to the form and the visitor, and TurnstileFormMixin
+deletes it after every validation, so a solved token can't be replayed. When Cloudflare can't be reached in
+time, TURNSTILE_FAIL_OPEN decides whether the check passes.
+
+Outcomes are counted in `metrics` and passed to `verification_observers`
+(config.metrics exports them to Prometheus).
+
+TURNSTILE_VERIFIER selects the verifier class, e.g.
+'accounts.turnstile.FakeTurnstileVerifier' in tests.
+"""
+
+import hashlib
+import http.client
+import logging
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from .nip_lookup import KeepAliveHTTPClient
+
+logger = logging.getLogger(__name__)
+
+try:
+    from turnstile.fields import TurnstileField
+except ImportError:
+    TurnstileField = None
+
+TURNSTILE_CACHE_PREFIX = 'turnstile:'
+
+
+class VerificationResult:
+    def __init__(self, success, error_codes=(), cached=False, degraded=False, elapsed=0.0):
+        self.success = success
+        self.error_codes = list(error_codes)
+        self.cached = cached
+        # True when Cloudflare didn't answer and the fail-open/closed policy decided
+        self.degraded = degraded
+        self.elapsed = elapsed
+
+    def __bool__(self):
+        return self.success
+
+
+class VerifierMetrics:
+    """Thread-safe counters and timings of verify calls."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.degraded = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, result):
+        with self.lock:
+            self.calls += 1
+            if result.cached:
+                self.cache_hits += 1
+                return
+            if not result.success:
+                self.failures += 1
+            if result.degraded:
+                self.degraded += 1
+            self.total_time += result.elapsed
+            self.max_time = max(self.max_time, result.elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            upstream = self.calls - self.cache_hits
+            return {
+                'calls': self.calls,
+                'cache_hits': self.cache_hits,
+                'failures': self.failures,
+                'degraded': self.degraded,
+                'avg_time': self.total_time / upstream if upstream else 0.0,
+                'max_time': self.max_time,
+            }
+
+
+metrics = VerifierMetrics()
+
+# Callables notified of every verify call: observer(result)
+verification_observers = []
+
+
+class BaseTurnstileVerifier:
+    def __init__(self):
+        self.cache_ttl = getattr(settings, 'TURNSTILE_CACHE_TTL', 120)
+        self.fail_open = getattr(settings, 'TURNSTILE_FAIL_OPEN', False)
+
+    def cache_key(self, token, scope=''):
+        return TURNSTILE_CACHE_PREFIX + hashlib.sha256(f'{scope}:{token}'.encode()).hexdigest()
+
+    def verify(self, token, remote_ip=None, scope=''):
+        """
+        Verify a widget token; returns a VerificationResult. A positive
+        result is cached for `scope` only (see TurnstileFormMixin).
+        """
+        if not token:
+            result = VerificationResult(False, ['missing-input-response'])
+        elif cache.get(self.cache_key(token, scope)):
+            result = VerificationResult(True, cached=True)
+        else:
+            started = time.monotonic()
+            result = self.verify_upstream(token, remote_ip)
+            result.elapsed = time.monotonic() - started
+            if result.success and not result.degraded:
+                cache.set(self.cache_key(token, scope), True, self.cache_ttl)
+            logger.info(
+                "Turnstile verify: success=%s degraded=%s errors=%s in %.3fs",
+                result.success, result.degraded, result.error_codes, result.elapsed
+            )
+        metrics.record(result)
+        for observer in verification_observers:
+            observer(result)
+        return result
+
+    def forget(self, token, scope=''):
+        """Drop a cached positive result once the token has been used."""
+        if token:
+            cache.delete(self.cache_key(token, scope))
+
+    def verify_upstream(self, token, remote_ip):
+        raise NotImplementedError
+
+    def unavailable(self, reason):
+        logger.warning("Turnstile unavailable (%s), failing %s", reason, 'open' if self.fail_open else 'closed')
+        return VerificationResult(self.fail_open, ['internal-error'], degraded=True)
+
+
+class TurnstileVerifier(BaseTurnstileVerifier):
+    """Verifies tokens against Cloudflare's siteverify endpoint."""
+
+    _client = None
+    _client_lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls):
+        if cls._client is None:
+            with cls._client_lock:
+                if cls._client is None:
+                    cls._client = KeepAliveHTTPClient(
+                        getattr(settings, 'TURNSTILE_VERIFY_URL', 'https://challenges.cloudflare.com/turnstile/v0'),
+                        timeout=getattr(settings, 'TURNSTILE_TIMEOUT', 2.0),
+                        pool_size=getattr(settings, 'TURNSTILE_POOL_SIZE', 4),
+                    )
+        return cls._client
+
+    def verify_upstream(self, token, remote_ip):
+        data = {'secret': settings.TURNSTILE_SECRET_KEY or '', 'response': token}
+        if remote_ip:
+            data['remoteip'] = remote_ip
+        try:
+            status, payload = self.get_client().post_form('/siteverify', data)
+        except (OSError, http.client.HTTPException) as e:
+            return self.unavailable(e)
+        if status != 200 or not isinstance(payload, dict):
+            return self.unavailable(f'HTTP {status}')
+        return VerificationResult(bool(payload.get('success')), payload.get('error-codes') or [])
+
+
+class FakeTurnstileVerifier(BaseTurnstileVerifier):
+    """
+    Local verifier for tests and development: every token passes except
+    those starting with 'fail' ('unavailable' simulates an outage).
+    """
+
+    def verify_upstream(self, token, remote_ip):
+        if token.startswith('unavailable'):
+            return self.unavailable('fake outage')
+        if token.startswith('fail'):
+            return VerificationResult(False, ['invalid-input-response'])
+        return VerificationResult(True)
+
+
+def get_verifier():
+    verifier_class = import_string(
+        getattr(settings, 'TURNSTILE_VERIFIER', 'accounts.turnstile.TurnstileVerifier')
+    )
+    return verifier_class()
+
+
+class CachedTurnstileField(TurnstileField or forms.Field):
+    """TurnstileField validated through get_verifier() instead of a blocking urlopen."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Set by TurnstileFormMixin from the current request
+        self.scope = ''
+        self.remote_ip = None
+
+    def validate(self, value):
+        forms.Field.validate(self, value)
+        if not get_verifier().verify(value, remote_ip=self.remote_ip, scope=self.scope):
+            raise forms.ValidationError(
+                _('Security check failed. Please try again.'),
+                code='invalid_turnstile'
+            )
+
+
+def turnstile_enabled():
+    """True when django-turnstile is installed and a site key is configured."""
+    return TurnstileField is not None and bool(getattr(settings, 'TURNSTILE_SITE_KEY', None))
+
+
+class TurnstileFormMixin:
+    """
+    Adds a CachedTurnstileField named 'turnstile' to a form (when Turnstile
+    is enabled). Call add_turnstile_field(request) from __init__; the cached
+    verification is bound to this form and the visitor (session, else IP)
+    and is dropped after every validation, passed or failed, so each
+    submission - e.g. each login attempt - needs a freshly solved widget.
+    """
+
+    def add_turnstile_field(self, request=None):
+        if not turnstile_enabled():
+            return
+        field = CachedTurnstileField()
+        field.scope = type(self).__name__
+        if request is not None:
+            # Never creates a session: anonymous GETs (and bots) stay session-less
+            visitor = request.session.session_key or request.META.get('REMOTE_ADDR', '')
+            field.scope = f'{field.scope}:{visitor}'
+            field.remote_ip = request.META.get('REMOTE_ADDR')
+        self.fields['turnstile'] = field
+
+    def full_clean(self):
+        super().full_clean()
+        if 'turnstile' in self.fields and self.is_bound:
+            field = self.fields['turnstile']
+            token = field.widget.value_from_datadict(self.data, self.files, self.add_prefix('turnstile'))
+            get_verifier().forget(token, field.scope)
@@ -19,4 +19,5 @@ urlpatterns = [
     
     # NIP validation API
     path('validate-nip/', views.validate_nip_api, name='validate_nip_api'),
+    path('verify-nips/', views.verify_nips_api, name='verify_nips_api'),
 ] 
\ No newline at end of file
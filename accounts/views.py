@@ -6,9 +6,12 @@ from django.core.exceptions import ValidationError
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
+from django.contrib.admin.views.decorators import staff_member_required
+import json
 import re
 from .models import ShippingAddress, InvoiceDetails, validate_polish_nip
 from .forms import ShippingAddressForm, InvoiceDetailsForm
+from .nip_lookup import get_nip_lookup_service, verify_nips
 
 @login_required
 def addresses_view(request):
@@ -274,219 +277,40 @@ def validate_nip_api(request):
     except Exception as e:
         return JsonResponse({'valid': False, 'error': f'Błąd serwera: {str(e)}'})
 
-def check_nip_in_gus(nip):
-    """Check NIP in GUS (Polish tax authority) database"""
-    try:
-        import urllib.request
-        import urllib.parse
-        import json
-        import ssl
-        import socket
-        from datetime import date
-        
-        # Use current date, but ensure it's within the 5-year limit
-        from datetime import datetime, timedelta
-        today = datetime.now().date()
-        
-        # API supports dates from last 5 years, use a recent date that should work
-        check_date = today.strftime('%Y-%m-%d')
-        url = f"https://wl-api.mf.gov.pl/api/search/nip/{nip}?date={check_date}"
-        
-        print(f"Checking NIP {nip} with GUS API: {url}")
-        
-        # First test basic connectivity
-        try:
-            socket.setdefaulttimeout(5)
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect(('wl-api.mf.gov.pl', 443))
-            print("✓ Basic connectivity to GUS API server OK")
-        except Exception as conn_err:
-            print(f"✗ Cannot connect to GUS API server: {conn_err}")
-            return None
-        
-        # Create SSL context
-        ssl_context = ssl.create_default_context()
-        
-        # Create request with proper headers
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        req.add_header('Accept', 'application/json')
-        req.add_header('Accept-Language', 'pl-PL,pl;q=0.9,en;q=0.8')
-        
-        with urllib.request.urlopen(req, timeout=10, context=ssl_context) as response:
-            response_text = response.read().decode('utf-8')
-            print(f"✓ GUS API response received (status: {response.status})")
-            
-            if response.status == 200:
-                try:
-                    data = json.loads(response_text)
-                    print(f"✓ JSON parsed successfully")
-                    
-                    # According to API docs: result.subject exists if NIP found
-                    if data.get('result') and data['result'].get('subject'):
-                        subject = data['result']['subject']
-                        # Check if actively registered (statusVat = "Czynny")
-                        status = subject.get('statusVat', '')
-                        name = subject.get('name', 'N/A')
-                        print(f"✓ Found: {name}, Status: {status}")
-                        
-                        if status == 'Czynny':
-                            # Extract company data for autofill
-                            working_address = subject.get('workingAddress', '')
-                            
-                            # For individual businesses, try other address fields if workingAddress is empty
-                            residence_address = subject.get('residenceAddress', '')  # Fixed: was 'residencyAddress'
-                            registered_address = subject.get('registeredAddress', '')
-                            
-                            # Also check Polish field names and alternative spellings
-                            adres_zamieszkania = subject.get('adresZamieszkania', '')
-                            adres_siedziby = subject.get('adresSiedziby', '')
-                            adres = subject.get('adres', '')
-                            
-                            # Print ALL available fields to debug
-                            print(f"=== COMPLETE GUS RESPONSE ANALYSIS ===")
-                            print(f"Available subject fields: {list(subject.keys())}")
-                            print(f"Total fields count: {len(subject.keys())}")
-                            
-                            # Print all fields with their values
-                            print("All field values:")
-                            for key, value in subject.items():
-                                if isinstance(value, str):
-                                    print(f"  {key}: '{value}'")
-                                else:
-                                    print(f"  {key}: {value}")
-                            
-                            print(f"\n=== ADDRESS FIELD ANALYSIS ===")
-                            address_candidates = {
-                                'workingAddress': working_address,
-                                'residenceAddress': residence_address,  # Fixed: was 'residencyAddress'
-                                'registeredAddress': registered_address,
-                                'adresZamieszkania': adres_zamieszkania,
-                                'adresSiedziby': adres_siedziby,
-                                'adres': adres
-                            }
-                            
-                            for field_name, field_value in address_candidates.items():
-                                if field_value:
-                                    print(f"  ✓ {field_name}: '{field_value}'")
-                                else:
-                                    print(f"  ✗ {field_name}: (empty or missing)")
-                            
-                            # Use the first available address (try all possible field names)
-                            address_to_parse = (working_address or residence_address or registered_address or 
-                                              adres_zamieszkania or adres_siedziby or adres)
-                            
-                            company_data = {
-                                'name': name,
-                                'working_address': working_address,
-                                'residence_address': residence_address,  # Fixed: was 'residency_address'
-                                'registered_address': registered_address,
-                                'parsed_from': 'working_address' if working_address else ('residence_address' if residence_address else ('registered_address' if registered_address else 'none'))
-                            }
-                            
-                            # Try to parse the address into components
-                            if address_to_parse:
-                                import re
-                                print(f"Parsing address from {company_data['parsed_from']}: '{address_to_parse}'")
-                                
-                                # Try multiple address formats that GUS might return:
-                                # Format 1: "STREET NUMBER, POSTAL_CODE CITY" (companies)
-                                # Format 2: "STREET NUMBER POSTAL_CODE CITY" (individual businesses)
-                                # Format 3: "ul. STREET NUMBER, POSTAL_CODE CITY"
-                                
-                                # First, try to find postal code and city (most reliable part)
-                                postal_city_match = re.search(r'(\d{2}-\d{3})\s+([^,]+?)(?:,|$)', address_to_parse)
-                                if postal_city_match:
-                                    postal_code = postal_city_match.group(1)
-                                    city = postal_city_match.group(2).strip()
-                                    company_data['postal_code'] = postal_code
-                                    company_data['city'] = city
-                                    print(f"✓ Found postal code: '{postal_code}', city: '{city}'")
-                                else:
-                                    print("✗ Could not extract postal code and city")
-                                
-                                # Now try to extract street address
-                                street = None
-                                
-                                # Method 1: Street before comma and postal code
-                                street_match = re.search(r'^(.+?)(?=\s*,\s*\d{2}-\d{3})', address_to_parse)
-                                if street_match:
-                                    street = street_match.group(1).strip()
-                                    print(f"✓ Street extracted (method 1): '{street}'")
-                                else:
-                                    # Method 2: Street before postal code (no comma)
-                                    street_match = re.search(r'^(.+?)(?=\s+\d{2}-\d{3})', address_to_parse)
-                                    if street_match:
-                                        street = street_match.group(1).strip()
-                                        print(f"✓ Street extracted (method 2): '{street}'")
-                                    else:
-                                        # Method 3: Take everything before postal code as fallback
-                                        parts = re.split(r'\s*\d{2}-\d{3}', address_to_parse)
-                                        if len(parts) > 0 and parts[0].strip():
-                                            street = parts[0].strip()
-                                            print(f"✓ Street extracted (method 3): '{street}'")
-                                        else:
-                                            print("✗ Could not extract street address")
-                                
-                                # Clean up the street if we found one
-                                if street:
-                                    # Remove common prefixes like "ul.", "al.", etc.
-                                    street = re.sub(r'^(ul\.|al\.|pl\.|os\.)\s*', '', street, flags=re.IGNORECASE)
-                                    # Remove trailing comma if present
-                                    street = street.rstrip(',').strip()
-                                    
-                                    if street:  # Make sure we still have something after cleaning
-                                        company_data['street'] = street
-                                        print(f"✓ Final street: '{street}'")
-                                    else:
-                                        print("✗ Street became empty after cleaning")
-                            else:
-                                print("✗ No address data available from GUS (checked workingAddress, residenceAddress, registeredAddress)")
-                                company_data['address_note'] = 'no_address_available'
-                            
-                            print(f"✓ Company data extracted: {company_data}")
-                            return {'found': True, 'data': company_data}
-                        else:
-                            print(f"✗ NIP inactive, status: {status}")
-                            return False
-                    else:
-                        print("✗ NIP not found in GUS database")
-                        return False
-                        
-                except json.JSONDecodeError as e:
-                    print(f"✗ JSON parsing error: {e}")
-                    return None
-            else:
-                print(f"✗ HTTP error status: {response.status}")
-                return None
-        
-    except urllib.error.HTTPError as e:
-        print(f"✗ HTTP Error: {e.code} - {e.reason}")
-        print(f"✗ URL that failed: {url}")
-        
-        if e.code == 404:
-            print(f"✗ 404 Error - NIP nie został znaleziony w bazie GUS")
-            print(f"  - NIP może nie istnieć w bazie GUS")
-            print(f"  - NIP może nie być aktywny w dniu {check_date}")
-            return False  # NIP not found in GUS, but checksum was valid
-            
-        try:
-            error_body = e.read().decode('utf-8')
-            print(f"✗ Error response body: {error_body}")
-        except:
-            pass
-            
-        return None  # Other HTTP errors
-        
-    except urllib.error.URLError as e:
-        print(f"✗ URL Error: {e.reason}")
-        return None
-        
-    except socket.timeout:
-        print(f"✗ Timeout connecting to GUS API")
-        return None
-        
-    except Exception as e:
-        print(f"✗ Unexpected error: {e}")
-        return None
+# Upper bound for one bulk verification request: the lookups run inline, so
+# keep it to about one round of parallel multi-NIP searches (4 workers x 30)
+# to stay well within proxy timeouts; larger lists go through `manage.py verify_nips`
+BULK_NIP_LIMIT = 120
 
+@staff_member_required
+@require_POST
+def verify_nips_api(request):
+    """Bulk NIP verification: POST {"nips": [...]} (JSON), returns a status per NIP"""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    nips = data.get('nips') if isinstance(data, dict) else None
+    if not isinstance(nips, list) or not all(isinstance(nip, str) for nip in nips):
+        return JsonResponse({'error': 'Expected {"nips": [...]}'}, status=400)
+    if len(nips) > BULK_NIP_LIMIT:
+        return JsonResponse({
+            'error': f'At most {BULK_NIP_LIMIT} NIPs per request; use the verify_nips command for larger lists'
+        }, status=400)
+    
+    results = verify_nips(nips)
+    summary = {}
+    for status in results.values():
+        summary[status] = summary.get(status, 0) + 1
+    return JsonResponse({'results': results, 'summary': summary})
 
+def check_nip_in_gus(nip):
+    """
+    Check NIP in GUS (Polish tax authority) database.
+    Returns {'found': True, 'data': {...}}, False (not found / inactive) or None (API unavailable).
+    """
+    result = get_nip_lookup_service().lookup(nip)
+    if result is None:
+        return None
+    return result if result.get('found') else False
@@ -10,6 +10,11 @@ from shop.models import Order, OrderItem, Category, Product, ShippingMethod, Pay
 from accounts.models import CustomUser, Address
 from accounts.admin import CustomUserAdmin, AddressAdmin
 from shop.admin import CategoryAdmin, ProductAdmin, OrderAdmin, OrderItemAdmin, ShippingMethodAdmin, PaymentMethodAdmin
+from jobs.models import Job
+from jobs.admin import JobAdmin
+from profiling.models import RequestProfile
+from profiling.admin import RequestProfileAdmin
+from config.instrumentation import view_stats
 
 class CustomAdminSite(admin.AdminSite):
     site_header = ''  # Remove all admin header text
@@ -21,6 +26,7 @@ class CustomAdminSite(admin.AdminSite):
             path('dashboard/', self.admin_view(self.dashboard_view), name='dashboard'),
             path('modules/', self.admin_view(self.module_management_view), name='module_management'),
             path('downloads/', self.admin_view(self.downloads_management_view), name='downloads_management'),
+            path('performance/', self.admin_view(self.performance_view), name='performance'),
         ]
         return custom_urls + urls
     
@@ -30,6 +36,7 @@ class CustomAdminSite(admin.AdminSite):
         extra_context['show_dashboard_link'] = True
         extra_context['show_module_management'] = True
         extra_context['show_downloads_management'] = True
+        extra_context['show_performance'] = True
         return super().index(request, extra_context)
     
     def dashboard_view(self, request):
@@ -98,6 +105,20 @@ class CustomAdminSite(admin.AdminSite):
         
         return render(request, 'admin/dashboard.html', context)
     
+    def performance_view(self, request):
+        """Rolling response-time percentiles per view (this server process)"""
+        if request.method == 'POST' and request.POST.get('reset'):
+            view_stats.reset()
+            return redirect('admin:performance')
+        
+        context = {
+            'title': _('Performance'),
+            'rows': view_stats.summary(),
+            'window': view_stats.window,
+            'opts': Order._meta,  # For admin template compatibility
+        }
+        return render(request, 'admin/performance.html', context)
+    
     def module_management_view(self, request):
         """Redirect to module management interface"""
         return redirect('modules:module_list')
@@ -138,4 +159,6 @@ admin_site.register(Order, OrderAdmin)
 admin_site.register(OrderItem, OrderItemAdmin)
 admin_site.register(UserCart, UserCartAdmin)
 admin_site.register(ShippingMethod, ShippingMethodAdmin)
-admin_site.register(PaymentMethod, PaymentMethodAdmin) 
\ No newline at end of file
+admin_site.register(PaymentMethod, PaymentMethodAdmin)
+admin_site.register(Job, JobAdmin)
+admin_site.register(RequestProfile, RequestProfileAdmin) 
\ No newline at end of file
@@ -1,17 +1,11 @@
-from shop.models import Product
+from shop.cart_service import get_cart_service
 
 def cart_info(request):
-    cart = request.session.get('cart', {})
-    count = 0
-    total = 0
-    if cart:
-        products = Product.objects.filter(id__in=cart.keys(), is_active=True)
-        for product in products:
-            qty = cart.get(str(product.id), 0)
-            price = product.discount_price or product.price
-            count += qty
-            total += price * qty
+    cart_service = get_cart_service(request)
+    count, total = cart_service.get_summary()
     return {
         'cart_count': count,
         'cart_total': total,
-    } 
\ No newline at end of file
+        # Seeds the client-side revision used for batch conflict checks
+        'cart_rev': cart_service.revision,
+    }
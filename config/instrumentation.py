@@ -0,0 +1,232 @@
+"""
+Per-request performance instrumentation.
+
+RequestMetrics collects DB query count/time, template render time, cache
+hits/misses and module hook time for the request being handled (kept in a
+context variable, so threads don't mix). install() hooks template rendering,
+the configured cache backends and module hooks once per process; DB queries
+are captured by the middleware with connection.execute_wrapper.
+
+ViewStats keeps a rolling window of response times per view for the
+p50/p95/p99 figures on the admin performance page (per process).
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_current = ContextVar('request_metrics', default=None)
+_installed = False
+_install_lock = threading.Lock()
+_MISSING = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+        self.module_time = 0.0
+        self.module_calls = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.elapsed * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'module_calls': self.module_calls,
+            'module_ms': round(self.module_time * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'mod;dur={self.module_time * 1000:.1f};desc="{self.module_calls} module hooks"',
+            f'total;dur={self.elapsed * 1000:.1f}',
+        ])
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper() hook timing each query."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.db_queries += 1
+        metrics.db_time += duration
+
+
+def _instrument_template_render(template_class):
+    original = template_class.render
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context, request)
+        # Only the outermost render counts; nested render_to_string calls are included in it
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+    template_class.render = render
+
+
+def _instrument_cache_class(cache_class):
+    if getattr(cache_class, '_instrumented', False):
+        return
+    original_get = cache_class.get
+    original_get_many = cache_class.get_many
+
+    # Backends implement one lookup with the other (BaseCache.get_many calls
+    # get, DatabaseCache.get calls get_many): only the outermost call counts
+    def get(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original_get(self, key, default, version=version)
+        metrics.cache_depth += 1
+        try:
+            value = original_get(self, key, _MISSING, version=version)
+        finally:
+            metrics.cache_depth -= 1
+        if value is _MISSING:
+            if not metrics.cache_depth:
+                metrics.cache_misses += 1
+            return default
+        if not metrics.cache_depth:
+            metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original_get_many(self, keys, version=version)
+        keys = list(keys)
+        metrics.cache_depth += 1
+        try:
+            found = original_get_many(self, keys, version=version)
+        finally:
+            metrics.cache_depth -= 1
+        if not metrics.cache_depth:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+
+    cache_class.get = get
+    cache_class.get_many = get_many
+    cache_class._instrumented = True
+
+
+def record_module_hook(module_name, hook, duration):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.module_calls += 1
+        metrics.module_time += duration
+
+
+def install():
+    """Hook template rendering, caches, module hooks and Turnstile checks (once per process)."""
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        from django.core.cache import caches
+        from django.template.backends.django import Template
+        from accounts.turnstile import verification_observers
+        from modules.base import hook_observers
+        from .metrics import observe_module_hook, observe_turnstile_verification
+
+        _instrument_template_render(Template)
+        for alias in settings.CACHES:
+            _instrument_cache_class(type(caches[alias]))
+        hook_observers.append(record_module_hook)
+        hook_observers.append(observe_module_hook)
+        verification_observers.append(observe_turnstile_verification)
+        _installed = True
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ViewStats:
+    """Rolling window of recent response times per view."""
+
+    def __init__(self, window=None):
+        self.window = window or getattr(settings, 'PERFORMANCE_WINDOW', 500)
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.lock = threading.Lock()
+
+    def record(self, view_name, metrics):
+        with self.lock:
+            self.samples[view_name].append((metrics.elapsed, metrics.db_queries, metrics.db_time))
+
+    def summary(self):
+        """Per-view counts, percentiles (ms) and average DB usage, slowest p95 first."""
+        with self.lock:
+            samples = {view: list(values) for view, values in self.samples.items()}
+        rows = []
+        for view, values in samples.items():
+            durations = sorted(value[0] for value in values)
+            rows.append({
+                'view': view,
+                'count': len(values),
+                'p50': round(percentile(durations, 0.50) * 1000, 1),
+                'p95': round(percentile(durations, 0.95) * 1000, 1),
+                'p99': round(percentile(durations, 0.99) * 1000, 1),
+                'avg_queries': round(sum(value[1] for value in values) / len(values), 1),
+                'avg_db_ms': round(sum(value[2] for value in values) / len(values) * 1000, 1),
+            })
+        rows.sort(key=lambda row: row['p95'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+
+view_stats = ViewStats()
@@ -0,0 +1,166 @@
+"""
+Prometheus metrics and the /metrics exposition view.
+
+Recorded per request by PerformanceMiddleware: latency per URL name, DB
+queries and DB time per request, cache hits/misses. Module hook timings
+(e.g. payment modules' process_payment) come from modules.base hook
+observers and Turnstile verifications from accounts.turnstile observers;
+the job-queue depth is read from the database on each scrape.
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty directory (wiped on
+each start) before the workers start: prometheus_client then keeps values
+in mmap-backed files there and the endpoint aggregates all workers. Call
+mark_worker_dead(worker.pid) from gunicorn's child_exit hook.
+"""
+
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds',
+        'Request latency by URL name',
+        ['url_name', 'method'],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    REQUESTS = Counter(
+        'http_requests_total',
+        'Requests by URL name and status class',
+        ['url_name', 'method', 'status'],
+    )
+    DB_QUERIES = Histogram(
+        'db_queries_per_request',
+        'DB queries per request by URL name',
+        ['url_name'],
+        buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+    DB_DURATION = Histogram(
+        'db_duration_seconds_per_request',
+        'Time spent in DB queries per request by URL name',
+        ['url_name'],
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+    CACHE_REQUESTS = Counter(
+        'cache_requests_total',
+        'Cache lookups by result (hit/miss)',
+        ['result'],
+    )
+    MODULE_HOOK_LATENCY = Histogram(
+        'module_hook_duration_seconds',
+        'Module hook call latency (payment, shipping, design modules)',
+        ['module', 'hook'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    TURNSTILE_VERIFICATIONS = Counter(
+        'turnstile_verifications_total',
+        'Turnstile verifications by outcome (passed, failed, cached, degraded)',
+        ['outcome'],
+    )
+    TURNSTILE_LATENCY = Histogram(
+        'turnstile_verify_duration_seconds',
+        'Latency of Turnstile siteverify calls (cache hits excluded)',
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 2.5, 5),
+    )
+
+    class JobQueueCollector:
+        """Job counts per queue and status, read at scrape time."""
+
+        def collect(self):
+            from django.db.models import Count
+            from jobs.models import Job
+
+            depth = GaugeMetricFamily('job_queue_depth', 'Jobs per queue and status', labels=['queue', 'status'])
+            rows = (
+                Job.objects.filter(status__in=('queued', 'running'))
+                .values('queue', 'status').annotate(count=Count('id')).order_by()
+            )
+            for row in rows:
+                depth.add_metric([row['queue'], row['status']], row['count'])
+            yield depth
+
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        REGISTRY.register(JobQueueCollector())
+
+
+def observe_request(url_name, request, response, metrics):
+    """Record one finished request (called by PerformanceMiddleware)."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    REQUEST_LATENCY.labels(url_name, request.method).observe(metrics.elapsed)
+    REQUESTS.labels(url_name, request.method, f'{response.status_code // 100}xx').inc()
+    DB_QUERIES.labels(url_name).observe(metrics.db_queries)
+    DB_DURATION.labels(url_name).observe(metrics.db_time)
+    if metrics.cache_hits:
+        CACHE_REQUESTS.labels('hit').inc(metrics.cache_hits)
+    if metrics.cache_misses:
+        CACHE_REQUESTS.labels('miss').inc(metrics.cache_misses)
+
+
+def observe_module_hook(module_name, hook, duration):
+    if PROMETHEUS_AVAILABLE:
+        MODULE_HOOK_LATENCY.labels(module_name, hook).observe(duration)
+
+
+def observe_turnstile_verification(result):
+    if not PROMETHEUS_AVAILABLE:
+        return
+    if result.cached:
+        TURNSTILE_VERIFICATIONS.labels('cached').inc()
+        return
+    if result.degraded:
+        TURNSTILE_VERIFICATIONS.labels('degraded').inc()
+    else:
+        TURNSTILE_VERIFICATIONS.labels('passed' if result.success else 'failed').inc()
+    TURNSTILE_LATENCY.observe(result.elapsed)
+
+
+def mark_worker_dead(pid):
+    """gunicorn child_exit hook helper for multi-process mode."""
+    if PROMETHEUS_AVAILABLE and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def is_metrics_request_allowed(request):
+    """Fail closed: a matching bearer token, a staff user, or DEBUG."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    return settings.DEBUG
+
+
+def metrics_view(request):
+    """
+    Prometheus exposition endpoint for scrapers sending the METRICS_TOKEN
+    bearer token, and for staff users. Without a token only DEBUG opens it.
+    """
+    if not is_metrics_request_allowed(request):
+        return HttpResponseForbidden()
+    if not PROMETHEUS_AVAILABLE:
+        return HttpResponse('prometheus_client is not installed', status=503, content_type='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Aggregate the values written by all worker processes
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(JobQueueCollector())
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,17 @@
+import json
+import logging
+from contextlib import ExitStack
+
 from django.contrib import messages
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
+from shop.cart_utils import flush_cart
+from shop.cart_storage import save_cart_storages
+from profiling.models import RequestProfile
+from profiling.profiler import get_requested_token, is_valid_token, profile_call, profiled_path
+from . import instrumentation, metrics as prometheus_metrics
+
+performance_logger = logging.getLogger('performance')
 
 class ClearMessagesMiddleware(MiddlewareMixin):
     """
@@ -39,4 +51,115 @@ class ClearMessagesMiddleware(MiddlewareMixin):
                 for message in messages_to_keep:
                     messages.add_message(request, message.level, message.message, message.tags)
         
-        return response 
\ No newline at end of file
+        return response 
+
+
+class CartFlushMiddleware(MiddlewareMixin):
+    """
+    Flush write-behind cart changes for authenticated users once the
+    CART_FLUSH_INTERVAL has passed, so a burst of quantity updates results
+    in a single UserCart write.
+    """
+    
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        # Check the user first so anonymous requests never load the session
+        if user is not None and user.is_authenticated and request.session.get('cart_dirty'):
+            flush_cart(request)
+        return response
+
+
+class CartStorageMiddleware(MiddlewareMixin):
+    """
+    Write cart state kept outside the session (e.g. the signed guest cart
+    cookie) onto the response.
+    """
+    
+    def process_response(self, request, response):
+        save_cart_storages(request, response)
+        return response
+
+
+class PerformanceMiddleware(MiddlewareMixin):
+    """
+    Measure each request: DB queries (count/time), template rendering, cache
+    hits/misses and module hooks. Results go to the 'performance' logger as
+    one JSON line per request, to the rolling per-view stats shown on the
+    admin performance page, and - for staff - to a Server-Timing header.
+    """
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        instrumentation.install()
+    
+    def process_request(self, request):
+        metrics, token = instrumentation.start_request()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(instrumentation.db_execute_wrapper))
+        request._performance = (metrics, token, stack)
+    
+    def process_response(self, request, response):
+        state = getattr(request, '_performance', None)
+        if state is None:
+            return response
+        metrics, token, stack = state
+        del request._performance
+        stack.close()
+        instrumentation.finish_request(token)
+        
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or 'unresolved'
+        instrumentation.view_stats.record(view_name, metrics)
+        prometheus_metrics.observe_request((match.url_name if match else None) or view_name, request, response, metrics)
+        
+        performance_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }))
+        
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile a single request on demand: staff send a signed token in the
+    X-Profile header or the _profile query parameter and the rest of the
+    request (inner middleware, view, ATOMIC_REQUESTS handling, exception
+    middleware) runs under the profiler; the profile is stored as a
+    RequestProfile, with the token stripped from the stored path.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        token = get_requested_token(request)
+        if token is None or not is_valid_token(token, request.user):
+            return self.get_response(request)
+        
+        response, result = profile_call(self.get_response, request)
+        match = getattr(request, 'resolver_match', None)
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=profiled_path(request)[:500],
+            view_name=(match.view_name if match else '')[:200],
+            status_code=response.status_code if response is not None else None,
+            user=request.user,
+            duration_ms=result.duration * 1000,
+            query_count=result.query_count,
+            query_time_ms=result.query_time * 1000,
+            pstats_data=result.pstats_bytes(),
+            collapsed_stacks=result.collapsed,
+            sql_log=result.sql_log,
+        )
+        if result.error is not None:
+            raise result.error
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
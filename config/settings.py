@@ -46,6 +46,8 @@ INSTALLED_APPS = [
     'accounts',  # New accounts app for custom user
     'shop',  # New shop app for e-commerce
     'modules',  # Module management system
+    'jobs',  # PostgreSQL-backed background job queue
+    'profiling',  # On-demand request profiles for staff
     'mptt',  # Django MPTT for tree structures
     'django_mptt_admin',  # MPTT admin interface with drag & drop
     'turnstile',  # Cloudflare Turnstile
@@ -56,14 +58,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.PerformanceMiddleware',  # Per-request timings (Server-Timing for staff)
 #    'django_browser_reload.middleware.BrowserReloadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.ProfilingMiddleware',  # Profile requests carrying a staff profiling token
     'django.contrib.messages.middleware.MessageMiddleware',
     'config.middleware.ClearMessagesMiddleware',  # Custom middleware to prevent message contamination
+    'config.middleware.CartFlushMiddleware',  # Flush coalesced (write-behind) cart changes
+    'config.middleware.CartStorageMiddleware',  # Save signed guest cart cookie
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -107,6 +113,76 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared cache used for catalog version stamps and short-lived response caches.
+# Use a backend shared by all workers in production (e.g. memcached, redis or
+# django.core.cache.backends.db.DatabaseCache after `manage.py createcachetable`).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Version stamps (cart summaries, category tree) must be seen by every worker:
+# `manage.py check --deploy` fails on a per-process backend (shop.E001)
+
+# Category tree snapshots are rebuilt at least this often (seconds), even without a
+# version bump; 0 disables the safety re-check
+CATEGORY_TREE_MAX_AGE = int(os.getenv('CATEGORY_TREE_MAX_AGE', 300))
+
+# Cart persistence
+# Authenticated carts are written to the database at most once per this many
+# seconds per user (write-behind); 0 writes every change immediately.
+CART_FLUSH_INTERVAL = int(os.getenv('CART_FLUSH_INTERVAL', '10'))
+
+# Anonymous carts live in a signed cookie (no session-table I/O for guests).
+# Carts that would exceed CART_COOKIE_MAX_SIZE bytes fall back to the session.
+CART_ANONYMOUS_STORAGE = 'shop.cart_storage.CookieCartStorage'
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days
+CART_COOKIE_MAX_SIZE = 3800
+
+# Performance instrumentation
+# Responses kept per view for the admin p50/p95/p99 figures
+PERFORMANCE_WINDOW = 500
+# Bearer token for /metrics scrapers; without it only staff users (or DEBUG) get the metrics
+# Multi-process (gunicorn) metrics also need PROMETHEUS_MULTIPROC_DIR in the environment
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# On-demand profiler: token lifetime (seconds) and stack sampling interval
+PROFILER_TOKEN_MAX_AGE = 60 * 60 * 24
+PROFILER_SAMPLE_INTERVAL = 0.005
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'performance': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        # One JSON line per request
+        'performance': {
+            'handlers': ['performance'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Product listings: 'pages' (numbered pages) or 'cursor' (keyset pagination, "load more");
+# ?cursor= switches a single request to cursor mode
+PRODUCT_LIST_PAGINATION = os.getenv('PRODUCT_LIST_PAGINATION', 'pages')
+
+# Post-order pipeline
+# Staff addresses notified about new orders (comma-separated)
+ORDER_NOTIFICATION_EMAILS = [e for e in os.getenv('ORDER_NOTIFICATION_EMAILS', '').split(',') if e]
+LOW_STOCK_THRESHOLD = 5
+# Unpaid orders (e.g. abandoned Stripe checkouts) are cancelled and their stock
+# released after this many seconds
+ORDER_PAYMENT_TIMEOUT = int(os.getenv('ORDER_PAYMENT_TIMEOUT', 60 * 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -184,9 +260,34 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 
+# NIP lookups (MF white-list API)
+MF_API_URL = os.getenv('MF_API_URL', 'https://wl-api.mf.gov.pl')
+NIP_LOOKUP_TIMEOUT = 3.0
+NIP_LOOKUP_SLOW_THRESHOLD = 2.0
+NIP_LOOKUP_FAILURE_THRESHOLD = 3
+NIP_LOOKUP_RESET_TIMEOUT = 60
+NIP_CACHE_TTL = 60 * 60 * 24
+NIP_NEGATIVE_CACHE_TTL = 60 * 60
+# Concurrent multi-NIP searches in bulk verification
+NIP_LOOKUP_WORKERS = 4
+
+# Outbound mail throttling (messages per second, burst size) and batching.
+# The limit is per process: divide the provider limit by the number of worker processes
+EMAIL_RATE_LIMIT = float(os.getenv('EMAIL_RATE_LIMIT', '5'))
+EMAIL_RATE_BURST = int(os.getenv('EMAIL_RATE_BURST', '10'))
+EMAIL_MAX_MESSAGES_PER_CONNECTION = 100
+NEWSLETTER_CHUNK_SIZE = 500
+
 # Cloudflare Turnstile Configuration
 TURNSTILE_SITE_KEY = os.getenv('TURNSTILE_SITE_KEY')
 TURNSTILE_SECRET_KEY = os.getenv('TURNSTILE_SECRET_KEY')
+# Verification latency budget (seconds) and what happens when Cloudflare is unreachable
+TURNSTILE_TIMEOUT = float(os.getenv('TURNSTILE_TIMEOUT', '2.0'))
+TURNSTILE_FAIL_OPEN = os.getenv('TURNSTILE_FAIL_OPEN', '').lower() == 'true'
+# Verified tokens are remembered per form and visitor until the form has been
+# validated once; the auth forms show the widget only when TURNSTILE_SITE_KEY is set
+TURNSTILE_CACHE_TTL = 120
+TURNSTILE_VERIFIER = os.getenv('TURNSTILE_VERIFIER', 'accounts.turnstile.TurnstileVerifier')
 
 # Module system configuration
 MODULE_SETTINGS = {
@@ -8,6 +8,7 @@ from django.urls import URLResolver, URLPattern
 from django.http import Http404, JsonResponse
 from home.views import homepage, register_view, login_view, logout_view, profile_view, verify_email, resend_verification_email, contact_view, about_view, terms_view, privacy_view
 from .admin import admin_site
+from .metrics import metrics_view
 from shop.views import product_list_public, product_detail_public, cart_view, checkout, place_order, order_success, checkout_step2_shipping_payment, checkout_step3_summary
 import os
 import json
@@ -115,26 +116,27 @@ def downloads_delete_api(request):
 
 def category_or_product_view(request, slug):
     """Handle both category and product URLs dynamically."""
-    from shop.models import Category, Product
+    from shop.models import Product
+    from shop.category_tree import get_category_tree
     
-    # First check if it's a category
-    try:
-        category = Category.objects.get(slug=slug, is_active=True)
+    # First check if it's a category (in-process tree snapshot, no query)
+    if get_category_tree().get_by_slug(slug) is not None:
         return product_list_public(request, category_slug=slug)
-    except Category.DoesNotExist:
-        # If not a category, check if it's a product
-        try:
-            product = Product.objects.get(slug=slug, is_active=True)
-            return product_detail_public(request, slug=slug)
-        except Product.DoesNotExist:
-            # If neither exists, raise 404
-            from django.http import Http404
-            raise Http404("Page not found")
+
+    # If not a category, check if it's a product
+    try:
+        product = Product.objects.get(slug=slug, is_active=True)
+        return product_detail_public(request, slug=slug)
+    except Product.DoesNotExist:
+        # If neither exists, raise 404
+        from django.http import Http404
+        raise Http404("Page not found")
 
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
     path('', homepage, name='home'),
     path('admin/', admin_site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('sklep/', include('shop.urls', namespace='shop')),
     # Redirect old /shop/ URLs to /sklep/ for backward compatibility
     path('shop/<path:remaining>', RedirectView.as_view(url='/sklep/%(remaining)s', permanent=True)),
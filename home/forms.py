@@ -3,9 +3,9 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
 from .validators import CustomPasswordValidator
-# from turnstile.fields import TurnstileField
+from accounts.turnstile import TurnstileFormMixin
 
-class CustomUserCreationForm(UserCreationForm):
+class CustomUserCreationForm(TurnstileFormMixin, UserCreationForm):
     email = forms.EmailField(
         label=_('Email'),
         max_length=254,
@@ -21,20 +21,16 @@ class CustomUserCreationForm(UserCreationForm):
         widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': _('Confirm your password')}),
         help_text=_('Enter the same password as before, for verification.')
     )
-    # captcha = TurnstileField(
-    #     label=_('Security Check'),
-    #     help_text=_('Please complete the security check to verify you are human.')
-    # )
-
     class Meta:
         model = CustomUser
         fields = ('email',)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['password1'].validators.append(CustomPasswordValidator())
+        self.add_turnstile_field(request)
 
-class CustomAuthenticationForm(AuthenticationForm):
+class CustomAuthenticationForm(TurnstileFormMixin, AuthenticationForm):
     username = forms.EmailField(
         label=_('Email'),
         widget=forms.EmailInput(attrs={'class': 'form-control', 'placeholder': _('Enter your email')})
@@ -42,4 +38,8 @@ class CustomAuthenticationForm(AuthenticationForm):
     password = forms.CharField(
         label=_('Password'),
         widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': _('Enter your password')})
-    ) 
\ No newline at end of file
+    )
+
+    def __init__(self, request=None, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        self.add_turnstile_field(request)
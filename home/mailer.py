@@ -0,0 +1,227 @@
+"""
+Outbound email delivery.
+
+Messages are sent over one authenticated connection that is reused for as
+many messages as possible (reconnecting if the server drops it), throttled
+by a per-process token bucket so bulk sends stay within the provider's rate
+limits.
+Campaign templates are compiled once and only rendered per recipient.
+
+Works with any EMAIL_BACKEND, e.g. the locmem backend in tests.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One bucket per process, shared by every Mailer and thread in it
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    The process-wide bucket configured by EMAIL_RATE_LIMIT (messages/second)
+    and EMAIL_RATE_BURST. The limit applies per process: with several worker
+    processes, divide the provider's limit between them.
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(
+                getattr(settings, 'EMAIL_RATE_LIMIT', 5),
+                getattr(settings, 'EMAIL_RATE_BURST', 10),
+            )
+        return _rate_limiter
+
+
+class Mailer:
+    """
+    Send many messages over a single connection.
+
+        with Mailer() as mailer:
+            for message in messages:
+                mailer.send(message)
+    """
+
+    def __init__(self, connection=None, rate_limiter=None, max_messages=None):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        # Some providers limit the messages per session
+        self.max_messages = max_messages or getattr(settings, 'EMAIL_MAX_MESSAGES_PER_CONNECTION', 100)
+        self.sent_on_connection = 0
+        self.is_open = False
+
+    def open(self):
+        if not self.is_open:
+            self.connection.open()
+            self.is_open = True
+            self.sent_on_connection = 0
+
+    def close(self):
+        if self.is_open:
+            try:
+                self.connection.close()
+            finally:
+                self.is_open = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _reconnect(self):
+        self.close()
+        self.open()
+
+    def send(self, message):
+        """Send one EmailMessage; returns the number of messages sent (0 or 1)."""
+        self.rate_limiter.acquire()
+        if self.sent_on_connection >= self.max_messages:
+            self._reconnect()
+        self.open()
+        message.connection = self.connection
+        try:
+            sent = self.connection.send_messages([message])
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Connection went stale - retry once on a fresh one
+            self._reconnect()
+            sent = self.connection.send_messages([message])
+        self.sent_on_connection += 1
+        return sent or 0
+
+    def send_many(self, messages):
+        return sum(self.send(message) for message in messages)
+
+
+# One mailer (connection) per worker thread, reused by transactional mail tasks;
+# all of them draw from the process-wide rate limiter
+_local = threading.local()
+
+
+def get_mailer():
+    mailer = getattr(_local, 'mailer', None)
+    if mailer is None:
+        mailer = _local.mailer = Mailer()
+    return mailer
+
+
+def send_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """Drop-in for send_mail() that reuses this thread's open connection."""
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=message,
+        from_email=from_email,  # None uses DEFAULT_FROM_EMAIL
+        to=recipient_list,
+    )
+    if html_message:
+        email.attach_alternative(html_message, 'text/html')
+    return get_mailer().send(email)
+
+
+class Campaign:
+    """
+    A mailing compiled once and rendered per recipient.
+
+    `subject` is a template string; `template_name` the HTML body template.
+    Both are rendered with the campaign context plus `recipient`.
+    """
+
+    def __init__(self, subject, template_name, context=None, from_email=None):
+        self.subject_template = Template(subject)
+        self.body_template = get_template(template_name).template
+        self.context = dict(context or {})
+        self.from_email = from_email
+
+    def build_message(self, recipient):
+        context = Context({**self.context, 'recipient': recipient})
+        # The subject is plain text, not HTML
+        subject_context = Context({**self.context, 'recipient': recipient}, autoescape=False)
+        subject = ' '.join(self.subject_template.render(subject_context).split())
+        html_message = self.body_template.render(context)
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=strip_tags(html_message),
+            from_email=self.from_email,
+            to=[recipient['email']],
+        )
+        email.attach_alternative(html_message, 'text/html')
+        return email
+
+
+def newsletter_recipients(queryset=None, chunk_size=None):
+    """Stream opted-in, active users in chunks without loading them all."""
+    if queryset is None:
+        from accounts.models import CustomUser
+        queryset = CustomUser.objects.filter(newsletter_opt_in=True, is_active=True)
+    chunk_size = chunk_size or getattr(settings, 'NEWSLETTER_CHUNK_SIZE', 500)
+    return (
+        queryset.order_by('pk')
+        .values('pk', 'email', 'first_name', 'last_name')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def send_campaign(campaign, recipients, mailer=None, progress=None):
+    """
+    Send a campaign to an iterable of recipient dicts.
+    Returns (sent, failed); one failing address doesn't stop the campaign.
+    """
+    sent = failed = 0
+    own_mailer = mailer is None
+    mailer = mailer or Mailer()
+    try:
+        mailer.open()
+        for recipient in recipients:
+            try:
+                sent += mailer.send(campaign.build_message(recipient))
+            except smtplib.SMTPRecipientsRefused as e:
+                failed += 1
+                logger.warning("Newsletter to %s refused: %s", recipient['email'], e)
+            if progress and (sent + failed) % 100 == 0:
+                progress(sent, failed)
+    finally:
+        if own_mailer:
+            mailer.close()
+    return sent, failed
@@ -0,0 +1,78 @@
+"""
+Django management command sending a newsletter to opted-in users.
+
+Usage:
+python manage.py send_newsletter --subject "News from Misamisa" --body-file news.txt
+python manage.py send_newsletter --subject "..." --body-file news.txt --template home/emails/newsletter.html
+python manage.py send_newsletter --subject "..." --body-file news.txt --dry-run
+python manage.py send_newsletter --subject "..." --body-file news.txt --rate 2 --chunk-size 200
+"""
+
+from django.core.management.base import BaseCommand
+from home.mailer import Campaign, Mailer, TokenBucket, newsletter_recipients, send_campaign
+
+
+class Command(BaseCommand):
+    help = 'Send a newsletter to all users who opted in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subject',
+            required=True,
+            help='Subject (template string, e.g. "Hi {{ recipient.first_name }}")'
+        )
+        parser.add_argument(
+            '--body-file',
+            required=True,
+            help='Text file with the newsletter body'
+        )
+        parser.add_argument(
+            '--template',
+            default='home/emails/newsletter.html',
+            help='HTML template (default: home/emails/newsletter.html)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Recipients fetched per query (default: NEWSLETTER_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help='Messages per second (default: EMAIL_RATE_LIMIT)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count recipients without sending anything'
+        )
+
+    def handle(self, *args, **options):
+        with open(options['body_file'], encoding='utf-8') as f:
+            body = f.read()
+
+        recipients = newsletter_recipients(chunk_size=options['chunk_size'])
+
+        if options['dry_run']:
+            count = sum(1 for _ in recipients)
+            self.stdout.write(f'Would send the newsletter to {count} subscriber(s)')
+            return
+
+        campaign = Campaign(
+            options['subject'],
+            options['template'],
+            context={'title': options['subject'], 'body': body},
+        )
+        rate_limiter = TokenBucket(options['rate']) if options['rate'] else None
+
+        def progress(sent, failed):
+            self.stdout.write(f'  ...{sent} sent, {failed} failed')
+
+        with Mailer(rate_limiter=rate_limiter) as mailer:
+            sent, failed = send_campaign(campaign, recipients, mailer=mailer, progress=progress)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Newsletter sent to {sent} subscriber(s), {failed} failed')
+        )
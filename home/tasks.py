@@ -0,0 +1,19 @@
+"""
+Background tasks for outgoing mail.
+"""
+
+from jobs.queue import task
+from .mailer import send_email
+
+
+@task(queue='default', priority=10, max_attempts=5)
+def send_mail_task(subject, message, recipient_list, html_message=None, from_email=None):
+    """Send an email from a worker; raises (and is retried) on SMTP errors."""
+    # Reuses the worker thread's open connection
+    send_email(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipient_list=recipient_list,
+        html_message=html_message,
+    )
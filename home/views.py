@@ -3,7 +3,6 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.http import HttpResponse
@@ -12,6 +11,7 @@ from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from accounts.models import CustomUser
 from home.models import News
 from shop.cart_utils import sync_cart_on_logout, sync_cart_on_login
+from .tasks import send_mail_task
 
 def homepage(request):
     news_items = News.objects.all()
@@ -42,7 +42,7 @@ def homepage(request):
 
 def register_view(request):
     if request.method == 'POST':
-        form = CustomUserCreationForm(request.POST)
+        form = CustomUserCreationForm(request.POST, request=request)
         if form.is_valid():
             user = form.save(commit=False)
             user.is_active = True  # User is active but email not verified
@@ -60,17 +60,13 @@ def register_view(request):
             plain_message = strip_tags(html_message)
             
             try:
-                print(f"Attempting to send email to: {user.email}")
-                print(f"Verification URL: {verification_url}")
-                send_mail(
-                    subject=_('Verify Your Email - Misamisa'),
+                # Sent by a background worker (retried on SMTP errors)
+                send_mail_task.delay(
+                    subject=str(_('Verify Your Email - Misamisa')),
                     message=plain_message,
-                    from_email=None,  # Uses DEFAULT_FROM_EMAIL
                     recipient_list=[user.email],
                     html_message=html_message,
-                    fail_silently=False,
                 )
-                print("Email sent successfully!")
                 
                 context = {'email': user.email}
                 if request.headers.get('HX-Request'):
@@ -78,7 +74,7 @@ def register_view(request):
                 return render(request, 'registration/registration_success.html', context)
                 
             except Exception as e:
-                print(f"Email sending failed: {str(e)}")
+                print(f"Email queueing failed: {str(e)}")
                 # If email fails, still create user but show error
                 messages.error(request, _('Account created but verification email could not be sent. Please contact support.'))
                 context = {'email': user.email}
@@ -88,7 +84,7 @@ def register_view(request):
         else:
             messages.error(request, _('Please correct the errors below.'))
     else:
-        form = CustomUserCreationForm()
+        form = CustomUserCreationForm(request=request)
     
     context = {'form': form}
     if request.headers.get('HX-Request'):
@@ -131,7 +127,7 @@ def login_view(request):
         else:
             messages.error(request, _('Please correct the errors below.'))
     else:
-        form = CustomAuthenticationForm()
+        form = CustomAuthenticationForm(request)
     
     context = {'form': form}
     if request.headers.get('HX-Request'):
@@ -190,13 +186,11 @@ def resend_verification_email(request):
             verification_url = request.build_absolute_uri(f'/verify-email/{user.email_verification_token}/')
             html_message = render_to_string('registration/email_verification.html', {'verification_url': verification_url})
             plain_message = strip_tags(html_message)
-            send_mail(
-                subject=_('Verify Your Email - Misamisa'),
+            send_mail_task.delay(
+                subject=str(_('Verify Your Email - Misamisa')),
                 message=plain_message,
-                from_email=None,
                 recipient_list=[user.email],
                 html_message=html_message,
-                fail_silently=False,
             )
             from django.contrib import messages
             messages.success(request, _('Verification email resent. Please check your inbox.'))
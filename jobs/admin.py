@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'queue', 'status', 'priority', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'queue', 'task')
+    search_fields = ('task', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        """Put dead or failed jobs back on the queue."""
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, _('%(count)d jobs requeued.') % {'count': updated})
+    retry_jobs.short_description = _('Retry selected jobs')
@@ -0,0 +1,145 @@
+"""
+Django management command running background job workers.
+
+Usage:
+python manage.py run_worker
+python manage.py run_worker --threads 4
+python manage.py run_worker --processes 2 --threads 4 --queue default --queue mail
+python manage.py run_worker --burst
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from jobs.queue import (
+    claim_jobs, heartbeat, run_job, requeue_stale_jobs, HEARTBEAT_INTERVAL, STALE_JOB_CHECK_INTERVAL,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers for the PostgreSQL job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Worker threads per process (default: 1)'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Worker processes (default: 1)'
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Queue to consume (repeatable, default: default)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty (default: 1.0)'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        self.queues = tuple(options['queues'] or ['default'])
+        self.threads = max(1, options['threads'])
+        self.poll_interval = options['poll_interval']
+        self.burst = options['burst']
+        self.stop_event = multiprocessing.Event()
+
+        processes = max(1, options['processes'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Starting {processes} process(es) x {self.threads} thread(s) on queues: {", ".join(self.queues)}'
+            )
+        )
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        if processes == 1:
+            self._run_process()
+            return
+
+        # Don't share database connections with forked children
+        connections.close_all()
+        children = [multiprocessing.Process(target=self._run_process) for _ in range(processes)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+
+    def _request_stop(self, signum, frame):
+        self.stop_event.set()
+
+    def _run_process(self):
+        requeue_stale_jobs()
+        workers = [
+            threading.Thread(target=self._work, args=(index,), daemon=True)
+            for index in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(done,), daemon=True)
+        beat.start()
+        for worker in workers:
+            worker.join()
+        done.set()
+        beat.join()
+
+    def _heartbeat(self, done):
+        """Keep the locks of this process's running jobs fresh, so they aren't requeued."""
+        prefix = f'{socket.gethostname()}:{os.getpid()}:'
+        try:
+            while not done.wait(HEARTBEAT_INTERVAL):
+                close_old_connections()
+                try:
+                    heartbeat(prefix)
+                except Exception as e:
+                    # Try again on the next beat; jobs are only requeued after STALE_JOB_TIMEOUT
+                    self.stderr.write(f'Heartbeat failed: {e}')
+        finally:
+            connections.close_all()
+
+    def _work(self, index):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        next_stale_check = time.monotonic() + STALE_JOB_CHECK_INTERVAL
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                # Recover jobs of workers that died while this one keeps running
+                if index == 0 and time.monotonic() >= next_stale_check:
+                    requeue_stale_jobs()
+                    next_stale_check = time.monotonic() + STALE_JOB_CHECK_INTERVAL
+                jobs = claim_jobs(worker_id, queues=self.queues)
+                if not jobs:
+                    if self.burst:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    started = time.monotonic()
+                    ok = run_job(job)
+                    self.stdout.write(
+                        f'[{worker_id}] {job.task} #{job.id} '
+                        f'{"done" if ok else job.status} in {time.monotonic() - started:.2f}s'
+                    )
+        finally:
+            connections.close_all()
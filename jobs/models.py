@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """A unit of background work stored in PostgreSQL and run by `manage.py run_worker`."""
+    STATUS_CHOICES = [
+        ('queued', _('Queued')),
+        ('running', _('Running')),
+        ('done', _('Done')),
+        ('dead', _('Dead')),
+    ]
+
+    task = models.CharField(_('task'), max_length=200)
+    queue = models.CharField(_('queue'), max_length=50, default='default')
+    payload = models.JSONField(_('payload'), default=dict, blank=True)
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(_('priority'), default=0, help_text=_('Higher runs first'))
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    max_attempts = models.PositiveIntegerField(_('max attempts'), default=5)
+    run_at = models.DateTimeField(_('run at'), default=timezone.now)
+    locked_by = models.CharField(_('locked by'), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_('locked at'), null=True, blank=True)
+    last_error = models.TextField(_('last error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('job')
+        verbose_name_plural = _('jobs')
+        ordering = ['-created_at']
+        indexes = [
+            # Claim query: queued jobs that are due, by priority
+            models.Index(
+                fields=['queue', '-priority', 'run_at'],
+                name='job_claim_idx',
+                condition=models.Q(status='queued'),
+            ),
+            models.Index(
+                fields=['locked_at'],
+                name='job_running_idx',
+                condition=models.Q(status='running'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.get_status_display()})"
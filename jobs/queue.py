@@ -0,0 +1,167 @@
+"""
+PostgreSQL-backed job queue.
+
+Tasks are plain functions registered with the @task decorator (usually in an
+app's tasks.py) and enqueued with `enqueue()` or `my_task.delay(...)`. Jobs
+are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers
+can poll the same table without blocking each other. Failed jobs are retried
+with exponential backoff and moved to the 'dead' state after max_attempts.
+"""
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions, keyed by task name
+_registry = {}
+
+# Retry backoff: BACKOFF_BASE * 2 ** (attempt - 1) seconds, capped, with jitter
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+
+# Workers refresh locked_at of their running jobs this often (seconds); a
+# running job whose heartbeat is older than STALE_JOB_TIMEOUT belongs to a
+# worker that died and is requeued
+HEARTBEAT_INTERVAL = 30
+STALE_JOB_TIMEOUT = timedelta(minutes=5)
+# How often running workers look for such jobs
+STALE_JOB_CHECK_INTERVAL = 60
+
+
+def task(name=None, queue='default', priority=0, max_attempts=5):
+    """
+    Register a function as a background task.
+
+        @task()
+        def send_something(user_id): ...
+
+        send_something.delay(user.id)
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        func.task_name = task_name
+        func.task_options = {'queue': queue, 'priority': priority, 'max_attempts': max_attempts}
+        func.delay = lambda *args, **kwargs: enqueue(task_name, *args, **kwargs)
+        _registry[task_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(task_name, *args, _priority=None, _run_at=None, _queue=None, **kwargs):
+    """
+    Store a job for a registered task; args and kwargs must be JSON-serializable.
+    Enqueued inside a transaction, the job only becomes visible when it commits.
+    """
+    if callable(task_name):
+        task_name = task_name.task_name
+    func = _registry.get(task_name)
+    if func is None:
+        raise ValueError(f"Unknown task: {task_name}")
+    options = func.task_options
+    return Job.objects.create(
+        task=task_name,
+        queue=_queue or options['queue'],
+        priority=options['priority'] if _priority is None else _priority,
+        max_attempts=options['max_attempts'],
+        run_at=_run_at or timezone.now(),
+        payload={'args': list(args), 'kwargs': kwargs},
+    )
+
+
+def claim_jobs(worker_id, queues=('default',), limit=1):
+    """Atomically claim up to `limit` due jobs for this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', queue__in=queues, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'id')[:limit]
+        )
+        for job in jobs:
+            job.status = 'running'
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+        if jobs:
+            Job.objects.bulk_update(jobs, ['status', 'locked_by', 'locked_at', 'attempts', 'updated_at'])
+    return jobs
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 4)
+
+
+def _finish(job, worker_id, **fields):
+    """
+    Store a job outcome, unless the job was requeued and claimed by someone
+    else in the meantime (it is then theirs to finish). Returns True if stored.
+    """
+    for name, value in fields.items():
+        setattr(job, name, value)
+    now = timezone.now()
+    stored = Job.objects.filter(pk=job.pk, status='running', locked_by=worker_id).update(
+        locked_by='', locked_at=None, updated_at=now, **fields
+    )
+    if not stored:
+        logger.warning("Job %s (%s) lost its lock to another worker, outcome not stored", job.id, job.task)
+    return bool(stored)
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    func = get_task(job.task)
+    worker_id = job.locked_by
+    try:
+        if func is None:
+            raise LookupError(f"Task {job.task} is not registered in this worker")
+        func(*job.payload.get('args', []), **job.payload.get('kwargs', {}))
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            _finish(job, worker_id, status='dead', finished_at=now, last_error=error)
+            logger.error("Job %s (%s) is dead after %s attempts:\n%s", job.id, job.task, job.attempts, error)
+        else:
+            run_at = now + timedelta(seconds=retry_delay(job.attempts))
+            _finish(job, worker_id, status='queued', run_at=run_at, last_error=error)
+            logger.warning("Job %s (%s) failed, retrying at %s:\n%s", job.id, job.task, run_at, error)
+        return False
+    _finish(job, worker_id, status='done', finished_at=timezone.now())
+    return True
+
+
+def heartbeat(worker_prefix):
+    """Refresh locked_at of the running jobs of workers whose id starts with worker_prefix."""
+    return Job.objects.filter(status='running', locked_by__startswith=worker_prefix).update(
+        locked_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Return jobs whose worker stopped sending heartbeats to the queue."""
+    now = timezone.now()
+    # queryset update() skips auto_now, so updated_at is set explicitly
+    return Job.objects.filter(status='running', locked_at__lt=now - timeout).update(
+        status='queued', locked_by='', locked_at=None, run_at=now, updated_at=now
+    )
+
+
+def queue_depth(queues=None):
+    """Number of queued jobs, optionally limited to some queues."""
+    jobs = Job.objects.filter(status='queued')
+    if queues:
+        jobs = jobs.filter(queue__in=queues)
+    return jobs.count()
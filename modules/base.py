@@ -3,6 +3,8 @@ Base module classes and utilities for the modular system.
 """
 import os
 import json
+import time
+import functools
 import importlib
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
@@ -82,6 +84,41 @@ class ModuleManifest:
         }
 
 
+# Module methods called from shop code at request time, timed by instrument_module()
+HOOK_METHODS = (
+    'get_payment_form', 'process_payment', 'validate_payment_data',
+    'create_payment_intent', 'handle_payment_success', 'handle_payment_failure',
+    'calculate_shipping', 'get_shipping_methods', 'get_theme_config', 'apply_theme',
+)
+
+# Callables notified of every hook call: observer(module_name, hook, duration_seconds)
+hook_observers = []
+
+
+def instrument_module(module: 'BaseModule') -> 'BaseModule':
+    """Wrap the hook methods of a loaded module so observers see their timings."""
+    for hook in HOOK_METHODS:
+        method = getattr(module, hook, None)
+        if method is None or getattr(method, '_instrumented', False):
+            continue
+
+        def make_wrapper(method, hook):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    duration = time.perf_counter() - started
+                    for observer in hook_observers:
+                        observer(module.module_name, hook, duration)
+            wrapper._instrumented = True
+            return wrapper
+
+        setattr(module, hook, make_wrapper(method, hook))
+    return module
+
+
 class BaseModule(ABC):
     """Base class for all modules with standardized structure"""
     
@@ -214,7 +251,10 @@ class PaymentModuleBase(BaseModule):
     
     @abstractmethod
     def process_payment(self, request: HttpRequest, form_data: Dict) -> Dict[str, Any]:
-        """Process payment and return result"""
+        """
+        Process payment and return result. Set 'awaiting_confirmation' when the
+        module confirms the payment later (e.g. a webhook sending order_placed).
+        """
         pass
     
     @abstractmethod
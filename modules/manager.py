@@ -11,7 +11,7 @@ from django.conf import settings
 from django.apps import apps
 from django.urls import path, include
 from django.contrib import admin
-from .base import BaseModule, PaymentModuleBase, ShippingModuleBase, DesignModuleBase, ModuleManifest
+from .base import BaseModule, PaymentModuleBase, ShippingModuleBase, DesignModuleBase, ModuleManifest, instrument_module
 import shutil
 import json
 
@@ -944,7 +944,7 @@ class ModuleManager:
             if module_class:
                 # Create instance with module name and path
                 module_instance = module_class(module_name, module_path)
-                return module_instance
+                return instrument_module(module_instance)
             else:
                 print(f"No valid module class found in {module_name}")
                 return None
@@ -255,7 +255,9 @@ class StripeModule(PaymentModuleBase):
             return {
                 'success': True,
                 'payment_intent_id': payment_intent.id,
-                'client_secret': payment_intent.client_secret
+                'client_secret': payment_intent.client_secret,
+                # Confirmed by the payment_intent.* webhooks, which send order_placed
+                'awaiting_confirmation': True,
             }
             
         except Exception as e:
@@ -305,6 +307,9 @@ class StripeModule(PaymentModuleBase):
             elif event['type'] == 'payment_intent.payment_failed':
                 payment_intent = event['data']['object']
                 self.handle_payment_failure(payment_intent)
+            elif event['type'] == 'payment_intent.canceled':
+                payment_intent = event['data']['object']
+                self.handle_payment_canceled(payment_intent)
             
             return JsonResponse({'status': 'success'})
             
@@ -326,6 +331,15 @@ class StripeModule(PaymentModuleBase):
                     payment_intent.id
                 ])
             
+            # Mark the order paid and continue its post-order pipeline
+            from shop.models import Order
+            from shop.signals import order_placed
+            from shop.inventory import confirm_order_payment
+            order = Order.objects.filter(payment_transaction_id=payment_intent.id).first()
+            if order and confirm_order_payment(order):
+                order.refresh_from_db()
+                order_placed.send(sender=Order, order=order)
+            
             print(f"Payment succeeded: {payment_intent.id}")
             
         except Exception as e:
@@ -343,11 +357,41 @@ class StripeModule(PaymentModuleBase):
                     WHERE stripe_payment_intent_id = %s
                 """, [payment_intent.id])
             
+            # The customer can still retry this PaymentIntent, so the order keeps
+            # its stock until the intent is canceled or the checkout expires
+            from shop.models import Order
+            Order.objects.filter(payment_transaction_id=payment_intent.id, status='pending').update(
+                payment_status='failed'
+            )
+            
             print(f"Payment failed: {payment_intent.id}")
             
         except Exception as e:
             print(f"Error handling payment failure: {e}")
     
+    def handle_payment_canceled(self, payment_intent):
+        """Handle a canceled PaymentIntent (final, no more retries)."""
+        try:
+            from django.db import connection
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE stripe_transactions 
+                    SET status = 'canceled'
+                    WHERE stripe_payment_intent_id = %s
+                """, [payment_intent.id])
+            
+            # Release the stock reserved for the order
+            from shop.models import Order
+            from shop.inventory import release_order_stock
+            order = Order.objects.filter(payment_transaction_id=payment_intent.id).first()
+            if order:
+                release_order_stock(order, payment_status='canceled')
+            
+            print(f"Payment canceled: {payment_intent.id}")
+            
+        except Exception as e:
+            print(f"Error handling payment cancellation: {e}")
+    
     def get_payment_methods_info(self):
         """Get information about supported payment methods."""
         return {
@@ -0,0 +1,74 @@
+import json
+
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
+from .models import RequestProfile
+from .profiler import PROFILE_PARAM, make_token
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'query_count', 'user')
+    list_filter = ('method', 'status_code', 'view_name')
+    search_fields = ('path', 'view_name')
+    exclude = ('pstats_data', 'collapsed_stacks', 'sql_log')
+    readonly_fields = (
+        'method', 'path', 'view_name', 'status_code', 'user', 'duration_ms',
+        'query_count', 'query_time_ms', 'created_at', 'downloads', 'formatted_sql_log',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                '<int:profile_id>/pstats/',
+                self.admin_site.admin_view(self.download_pstats),
+                name='profiling_requestprofile_pstats'
+            ),
+            path(
+                '<int:profile_id>/collapsed/',
+                self.admin_site.admin_view(self.download_collapsed),
+                name='profiling_requestprofile_collapsed'
+            ),
+        ]
+        return custom_urls + urls
+
+    def changelist_view(self, request, extra_context=None):
+        """Show the current user's profiling token above the list."""
+        extra_context = extra_context or {}
+        extra_context['profiling_token'] = make_token(request.user)
+        extra_context['profiling_param'] = PROFILE_PARAM
+        return super().changelist_view(request, extra_context)
+
+    def download_pstats(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        response = HttpResponse(bytes(profile.pstats_data), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.prof"'
+        return response
+
+    def download_collapsed(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.collapsed.txt"'
+        return response
+
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">{}</a> &middot; <a href="{}">{}</a>',
+            reverse(f'{self.admin_site.name}:profiling_requestprofile_pstats', args=[obj.pk]),
+            _('pstats (.prof)'),
+            reverse(f'{self.admin_site.name}:profiling_requestprofile_collapsed', args=[obj.pk]),
+            _('collapsed stacks (flamegraph)'),
+        )
+    downloads.short_description = _('Downloads')
+
+    def formatted_sql_log(self, obj):
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', json.dumps(obj.sql_log, indent=2))
+    formatted_sql_log.short_description = _('SQL log')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.2 on 2026-10-17 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='method')),
+                ('path', models.CharField(max_length=500, verbose_name='path')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='view')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='status code')),
+                ('duration_ms', models.FloatField(verbose_name='duration (ms)')),
+                ('query_count', models.PositiveIntegerField(default=0, verbose_name='queries')),
+                ('query_time_ms', models.FloatField(default=0, verbose_name='query time (ms)')),
+                ('pstats_data', models.BinaryField(verbose_name='pstats data')),
+                ('collapsed_stacks', models.TextField(blank=True, verbose_name='collapsed stacks')),
+                ('sql_log', models.JSONField(blank=True, default=list, verbose_name='SQL log')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'request profile',
+                'verbose_name_plural': 'request profiles',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RequestProfile(models.Model):
+    """A profile of one request, recorded on demand for staff."""
+    method = models.CharField(_('method'), max_length=10)
+    path = models.CharField(_('path'), max_length=500)
+    view_name = models.CharField(_('view'), max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField(_('status code'), null=True, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='request_profiles',
+        verbose_name=_('user')
+    )
+    duration_ms = models.FloatField(_('duration (ms)'))
+    query_count = models.PositiveIntegerField(_('queries'), default=0)
+    query_time_ms = models.FloatField(_('query time (ms)'), default=0)
+    # marshal-serialized cProfile stats, loadable with pstats.Stats
+    pstats_data = models.BinaryField(_('pstats data'))
+    # Sampled stacks in collapsed format ("frame;frame;frame count"), for flamegraph tools
+    collapsed_stacks = models.TextField(_('collapsed stacks'), blank=True)
+    sql_log = models.JSONField(_('SQL log'), default=list, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('request profile')
+        verbose_name_plural = _('request profiles')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
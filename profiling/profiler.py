@@ -0,0 +1,159 @@
+"""
+On-demand request profiling.
+
+A staff member sends a signed profiling token (from the admin "Request
+profiles" page) in the X-Profile header or the _profile query parameter.
+That request (the middleware below ProfilingMiddleware and the view) then
+runs under cProfile while a sampler thread records its stack every
+PROFILER_SAMPLE_INTERVAL seconds; the SQL of the request is logged as well.
+Requests without the flag only pay for one META/query string lookup.
+"""
+
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+TOKEN_SALT = 'profiling.request'
+
+
+def make_token(user):
+    return signing.dumps({'u': user.pk}, salt=TOKEN_SALT)
+
+
+def get_requested_token(request):
+    """Profiling token sent with the request, or None (cheap check first)."""
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        return token
+    if PROFILE_PARAM in request.META.get('QUERY_STRING', ''):
+        return request.GET.get(PROFILE_PARAM)
+    return None
+
+
+def profiled_path(request):
+    """The request's full path without the _profile token."""
+    query = request.GET.copy()
+    query.pop(PROFILE_PARAM, None)
+    return f'{request.path}?{query.urlencode()}' if query else request.path
+
+
+def is_valid_token(token, user):
+    if not user.is_authenticated or not user.is_staff:
+        return False
+    try:
+        data = signing.loads(
+            token, salt=TOKEN_SALT, max_age=getattr(settings, 'PROFILER_TOKEN_MAX_AGE', 60 * 60 * 24)
+        )
+    except signing.BadSignature:
+        return False
+    return data.get('u') == user.pk
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        filename = os.path.relpath(filename, base)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.counts.most_common())
+
+
+class ProfileResult:
+    def __init__(self, duration, stats, collapsed, sql_log, error=None):
+        self.duration = duration
+        self.stats = stats
+        self.collapsed = collapsed
+        self.sql_log = sql_log
+        # Exception raised by the profiled call, if any
+        self.error = error
+
+    @property
+    def query_count(self):
+        return len(self.sql_log)
+
+    @property
+    def query_time(self):
+        return sum(entry['ms'] for entry in self.sql_log) / 1000
+
+    def pstats_bytes(self):
+        """Same format as pstats.Stats.dump_stats()."""
+        return marshal.dumps(self.stats)
+
+
+def profile_call(func, *args, **kwargs):
+    """
+    Run func under the profiler; returns (result, ProfileResult). An
+    exception raised by func doesn't propagate: result is None and the
+    exception is in ProfileResult.error, so the caller can store the
+    profile before re-raising it.
+    """
+    sql_log = []
+
+    def log_sql(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            sql_log.append({
+                'sql': sql,
+                'params': repr(params)[:500],
+                'many': many,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+    sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILER_SAMPLE_INTERVAL', 0.005))
+    profiler = cProfile.Profile()
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log_sql))
+        sampler.start()
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = profiler.runcall(func, *args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            duration = time.perf_counter() - started
+            sampler.stop()
+    profiler.create_stats()
+    return result, ProfileResult(duration, profiler.stats, sampler.collapsed(), sql_log, error)
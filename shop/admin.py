@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from .models import Category, Product, ProductImage, Order, OrderItem, ShippingMethod, PaymentMethod
+from .product_cards import refresh_product_cards
+from .category_stats import refresh_category_stats
 from django import forms
 import json
 
@@ -241,6 +243,8 @@ class ProductAdmin(admin.ModelAdmin):
             if form.is_valid():
                 category = form.cleaned_data['category']
                 updated = products.update(category=category)
+                refresh_product_cards(id_list)
+                refresh_category_stats()
                 self.message_user(request, _(f"{updated} products assigned to category '{category}'."), messages.SUCCESS)
                 return HttpResponseRedirect(reverse('admin:shop_product_changelist'))
         else:
@@ -355,7 +359,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'status', 'total_amount', 'item_count', 'created_at')
     list_filter = ('status', 'created_at', 'updated_at')
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'id')
-    readonly_fields = ('created_at', 'updated_at', 'total_amount', 'item_count')
+    readonly_fields = ('created_at', 'updated_at', 'total_amount', 'item_count', 'pipeline_status')
     inlines = [OrderItemInline]
     list_select_related = ('user', 'shipping_address', 'billing_address')
     
@@ -372,6 +376,10 @@ class OrderAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
             'description': 'Calculated totals based on order items'
         }),
+        ('Post-order Pipeline', {
+            'fields': ('pipeline_status',),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -1,6 +1,35 @@
 from django.apps import AppConfig
+from django.core import checks
+
+# Backends whose data is private to one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """`manage.py check --deploy`: version stamps need a cache shared by all workers."""
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Error(
+            f'{backend} is private to each worker, so catalog and category version '
+            'stamps would not reach the other workers.',
+            hint='Set CACHE_BACKEND to a shared backend, e.g. '
+                 'django.core.cache.backends.db.DatabaseCache after `manage.py createcachetable`.',
+            id='shop.E001',
+        )
+    ]
 
 
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        from . import signals  # noqa: F401
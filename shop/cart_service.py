@@ -0,0 +1,149 @@
+"""
+Request-scoped cart service.
+
+Loads the products referenced by the stored cart once per request and
+memoizes the priced cart lines, total and item count so the context
+processor, the cart views and the AJAX endpoints all share one catalog query.
+"""
+
+from decimal import Decimal
+
+from .cart_utils import (
+    get_cart_products, build_cart_item, validate_and_price_cart,
+    get_catalog_version, get_cart_revision, get_stored_cart, store_cart, persist_session_cart,
+)
+from .cart_storage import get_cart_storage
+
+
+class CartService:
+    """Cart data for a single request, attached lazily via get_cart_service()."""
+
+    def __init__(self, request):
+        self.request = request
+        self._products = {}
+        self._loaded_ids = set()
+        self._priced_key = None
+        self._priced_items = []
+
+    @property
+    def cart(self):
+        """The stored cart (session or guest cookie) as {product_id: quantity}."""
+        return get_stored_cart(self.request)
+
+    @property
+    def revision(self):
+        """Server-side cart revision, bumped on every change to the cart."""
+        return get_cart_revision(self.request)
+
+    def get_products(self, product_ids=()):
+        """
+        Return loaded products for the cart plus any extra IDs, keyed by string ID.
+        Only IDs not seen yet in this request hit the database, in one query.
+        """
+        wanted = {str(product_id) for product_id in self.cart.keys()}
+        wanted.update(str(product_id) for product_id in product_ids)
+        missing = wanted - self._loaded_ids
+        if missing:
+            self._products.update(get_cart_products(missing))
+            self._loaded_ids.update(missing)
+        return self._products
+
+    def get_product(self, product_id):
+        """Return a single active product or None."""
+        return self.get_products([product_id]).get(str(product_id))
+
+    def _price(self, cart):
+        key = tuple(cart.items())
+        if key != self._priced_key:
+            products = self.get_products(cart.keys())
+            self._priced_items = [
+                build_cart_item(products[str(product_id)], qty)
+                for product_id, qty in cart.items()
+                if str(product_id) in products
+            ]
+            self._priced_key = key
+        return self._priced_items
+
+    @property
+    def items(self):
+        """Priced cart lines for the current stored cart."""
+        return self._price(self.cart)
+
+    @property
+    def total(self):
+        return sum((item['subtotal'] for item in self.items), 0)
+
+    @property
+    def count(self):
+        return sum(item['quantity'] for item in self.items)
+
+    def get_summary(self):
+        """
+        Return (count, total) for the header badge without touching the DB
+        when possible. The summary is stored with the cart together with the
+        cart it was computed for and the catalog version stamp, and is only
+        recomputed when either of them changed.
+        """
+        cart = self.cart
+        if not cart:
+            return 0, 0
+        signature = [[str(product_id), qty] for product_id, qty in sorted(cart.items())]
+        version = get_catalog_version()
+        storage = get_cart_storage(self.request)
+        summary = storage.get('cart_summary')
+        if summary and summary.get('version') == version and summary.get('cart') == signature:
+            return summary['count'], Decimal(summary['total'])
+        count, total = self.count, self.total
+        storage['cart_summary'] = {
+            'cart': signature,
+            'version': version,
+            'count': count,
+            'total': str(total),
+        }
+        return count, total
+
+    def validate(self, cart=None):
+        """
+        Validate and price a cart (the stored cart by default) using the
+        already loaded products.
+        Returns: (cleaned_cart, changes_made, change_messages, cart_items)
+        """
+        if cart is None:
+            cart = self.cart
+        cleaned_cart, changes_made, change_messages, cart_items = validate_and_price_cart(
+            cart, products=self.get_products(cart.keys())
+        )
+        # Seed the memo so the cleaned cart is not priced again
+        self._priced_key = tuple(cleaned_cart.items())
+        self._priced_items = cart_items
+        return cleaned_cart, changes_made, change_messages, cart_items
+
+    def invalidate(self):
+        """Drop memoized lines; products already loaded stay valid for this request."""
+        self._priced_key = None
+        self._priced_items = []
+
+    def update(self, cart):
+        """
+        Store a mutated cart (session or guest cookie) and sync it to the database for
+        authenticated users (write-behind when CART_FLUSH_INTERVAL is set).
+        Returns True if the database rows changed.
+        """
+        store_cart(self.request, cart)
+        if self._priced_key != tuple(cart.items()):
+            self.invalidate()
+        return persist_session_cart(self.request)
+
+    def clear(self):
+        """Empty the stored cart."""
+        store_cart(self.request, {})
+        self.invalidate()
+
+
+def get_cart_service(request):
+    """Return the CartService for this request, creating it on first use."""
+    service = getattr(request, '_cart_service', None)
+    if service is None:
+        service = CartService(request)
+        request._cart_service = service
+    return service
@@ -0,0 +1,256 @@
+"""
+Pluggable cart storage backends.
+
+The cart state ('cart', 'cart_rev', 'cart_summary', 'cart_id') lives either
+in the session (authenticated users) or in a compact signed cookie
+(anonymous visitors), so browsing guests cause no session-table I/O.
+The backend used for guests is configurable via CART_ANONYMOUS_STORAGE.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.utils.module_loading import import_string
+
+# Keys making up the cart state
+CART_STATE_KEYS = ('cart', 'cart_rev', 'cart_summary', 'cart_id')
+# Session flag: the cart state in the session is a guest cart (see CookieCartStorage)
+GUEST_SESSION_FLAG = 'cart_guest'
+
+
+class BaseCartStorage:
+    """Dict-like access to the cart state of a request."""
+
+    def __init__(self, request):
+        self.request = request
+        self.modified = False
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def __setitem__(self, key, value):
+        raise NotImplementedError
+
+    def pop(self, key, default=None):
+        raise NotImplementedError
+
+    @property
+    def key(self):
+        """Stable identifier of this cart, used to scope per-cart caches."""
+        cart_id = self.get('cart_id')
+        if not cart_id:
+            cart_id = uuid.uuid4().hex
+            self['cart_id'] = cart_id
+        return cart_id
+
+    def clear(self):
+        """Drop the whole cart state."""
+        for key in CART_STATE_KEYS:
+            self.pop(key, None)
+
+    def save(self, response):
+        """Persist changes on the outgoing response (if the backend needs to)."""
+
+    def claim_session_cart(self):
+        """Adopt guest cart state found in the session (no-op for session storage)."""
+
+
+class SessionCartStorage(BaseCartStorage):
+    """Cart state stored in the Django session."""
+
+    def get(self, key, default=None):
+        return self.request.session.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.request.session[key] = value
+        self.modified = True
+
+    def pop(self, key, default=None):
+        if key not in self.request.session:
+            return default
+        self.modified = True
+        return self.request.session.pop(key, default)
+
+
+class CookieCartStorage(BaseCartStorage):
+    """
+    Cart state stored in a signed, compressed cookie.
+
+    If the encoded state would exceed CART_COOKIE_MAX_SIZE the state is kept
+    in the session instead (flagged as a guest cart) and the cookie only
+    says so; the session is read only for such carts. Guest carts stored in
+    the session before this backend existed are moved into the cookie the
+    first time the visitor comes back, or merged on login (see
+    claim_session_cart). A signed-in user's session cart is never read into
+    guest storage.
+    """
+    cookie_salt = 'shop.cart'
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._data = None
+        self._from_session = False
+        # The session was looked at for an older cart: remember that in the cookie
+        self._session_checked = False
+
+    @property
+    def cookie_name(self):
+        return getattr(settings, 'CART_COOKIE_NAME', 'cart')
+
+    @property
+    def cookie_age(self):
+        return getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 30)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'CART_COOKIE_MAX_SIZE', 3800)
+
+    def _read_cookie(self):
+        value = self.request.COOKIES.get(self.cookie_name)
+        if not value:
+            return None
+        try:
+            data = signing.loads(value, salt=self.cookie_salt, max_age=self.cookie_age)
+        except signing.BadSignature:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _session_state(self):
+        session = self.request.session
+        state = {key: session[key] for key in CART_STATE_KEYS if key in session}
+        self._from_session = bool(state)
+        return state
+
+    def _load(self):
+        if self._data is None:
+            data = self._read_cookie()
+            session = self.request.session
+            if data is not None and data.get(GUEST_SESSION_FLAG):
+                # Too large for the cookie - the state is in the session
+                data = self._session_state() if session.get(GUEST_SESSION_FLAG) else {}
+            elif data is None:
+                data = {}
+                if self.request.user.is_authenticated:
+                    if session.get(GUEST_SESSION_FLAG):
+                        data = self._session_state()
+                elif settings.SESSION_COOKIE_NAME in self.request.COOKIES:
+                    # Cart kept in the session by older versions: move it into the cookie once
+                    data = self._session_state()
+                    self._session_checked = True
+                    self.modified = True
+            self._data = data
+        return self._data
+
+    def claim_session_cart(self):
+        """
+        Treat cart state left in the session as this guest's cart (called right
+        after login, before the session cart becomes the user's).
+        """
+        if self._read_cookie() is not None:
+            # The cookie holds the guest cart (or points at the session)
+            return
+        session = self.request.session
+        if not session.get(GUEST_SESSION_FLAG) and session.get('cart'):
+            session[GUEST_SESSION_FLAG] = True
+            self._data = None
+
+    def get(self, key, default=None):
+        return self._load().get(key, default)
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def pop(self, key, default=None):
+        data = self._load()
+        if key not in data:
+            return default
+        self.modified = True
+        return data.pop(key, default)
+
+    def _clear_session_state(self):
+        session = self.request.session
+        session.pop(GUEST_SESSION_FLAG, None)
+        self._from_session = False
+        # Once logged in, the session cart belongs to the session backend
+        if self.request.user.is_authenticated:
+            return
+        for key in CART_STATE_KEYS:
+            session.pop(key, None)
+
+    def _set_cookie(self, response, value):
+        response.set_cookie(
+            self.cookie_name,
+            value,
+            max_age=self.cookie_age,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+
+    def save(self, response):
+        if not self.modified:
+            return
+        data = self._load()
+        if not data.get('cart'):
+            # Nothing worth keeping
+            if self._from_session:
+                self._clear_session_state()
+            if self._session_checked and not self.request.user.is_authenticated:
+                # Empty marker, so the session isn't checked again on the next request
+                self._set_cookie(response, signing.dumps({}, salt=self.cookie_salt))
+            else:
+                response.delete_cookie(self.cookie_name, samesite='Lax')
+            return
+        value = signing.dumps(data, salt=self.cookie_salt, compress=True)
+        if len(value) > self.max_size and not self.request.user.is_authenticated:
+            # Too large for a cookie - keep it in the session instead
+            self.request.session.update(data)
+            self.request.session[GUEST_SESSION_FLAG] = True
+            self._from_session = True
+            self._set_cookie(response, signing.dumps({GUEST_SESSION_FLAG: True}, salt=self.cookie_salt))
+            return
+        self._set_cookie(response, value)
+        if self._from_session:
+            self._clear_session_state()
+
+
+def get_anonymous_storage_class():
+    return import_string(
+        getattr(settings, 'CART_ANONYMOUS_STORAGE', 'shop.cart_storage.CookieCartStorage')
+    )
+
+
+def get_cart_storage(request):
+    """
+    Return the cart storage for the current user of this request.
+    Storages created during the request are remembered so the response
+    middleware can save all of them (e.g. clearing the guest cookie on login).
+    """
+    authenticated = request.user.is_authenticated
+    storages = getattr(request, '_cart_storages', None)
+    if storages is None:
+        storages = request._cart_storages = {}
+    storage = storages.get(authenticated)
+    if storage is None:
+        storage_class = SessionCartStorage if authenticated else get_anonymous_storage_class()
+        storage = storages[authenticated] = storage_class(request)
+    return storage
+
+
+def get_guest_cart_storage(request):
+    """Return the anonymous-visitor storage regardless of the current user."""
+    storages = getattr(request, '_cart_storages', None)
+    if storages is None:
+        storages = request._cart_storages = {}
+    storage = storages.get(False)
+    if storage is None:
+        storage = storages[False] = get_anonymous_storage_class()(request)
+    return storage
+
+
+def save_cart_storages(request, response):
+    """Save every cart storage used during the request onto the response."""
+    for storage in getattr(request, '_cart_storages', {}).values():
+        storage.save(response)
@@ -1,34 +1,90 @@
 """
-Cart utility functions for handling session and database cart synchronization.
+Cart utility functions for handling session/cookie and database cart synchronization.
 """
 
+import time
+import uuid
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
+from django.db import transaction
 from django.db.models import Q
-from .models import UserCart, Product
+from .models import UserCart, Product, PendingCartFlush
+from .cart_storage import get_cart_storage, get_guest_cart_storage
 
 
 def save_cart_to_database(user, session_cart):
-    """Save session cart to database for authenticated user."""
+    """
+    Persist session cart to database for authenticated user.
+
+    Loads the user's current cart rows once, diffs them against the session
+    cart and applies only the needed inserts, updates and deletes in bulk.
+    Returns True if any row was written, False if the database was already
+    up to date.
+    """
     if not user.is_authenticated:
-        return
-    
-    # Clear existing cart items for this user
-    UserCart.objects.filter(user=user).delete()
+        return False
     
-    # Save session cart items to database
+    # Normalize session cart to {product_id (int): quantity}
+    desired = {}
     for product_id, quantity in session_cart.items():
         try:
-            product = Product.objects.get(id=product_id, is_active=True)
-            UserCart.objects.create(
-                user=user,
-                product=product,
-                quantity=quantity
-            )
-        except Product.DoesNotExist:
+            product_id = int(product_id)
+            quantity = int(quantity)
+        except (ValueError, TypeError):
             # Skip invalid product IDs
-            pass
+            continue
+        if quantity > 0:
+            desired[product_id] = quantity
+    
+    with transaction.atomic():
+        existing = {
+            row['product_id']: row
+            for row in UserCart.objects.filter(user=user).values(
+                'id', 'product_id', 'quantity', 'product__is_active'
+            )
+        }
+        
+        # Rows to drop: no longer in cart or product deactivated
+        to_delete = [
+            row['id'] for product_id, row in existing.items()
+            if product_id not in desired or not row['product__is_active']
+        ]
+        
+        # Rows whose quantity changed
+        now = timezone.now()
+        to_update = [
+            UserCart(id=row['id'], quantity=desired[product_id], updated_at=now)
+            for product_id, row in existing.items()
+            if product_id in desired and row['product__is_active']
+            and row['quantity'] != desired[product_id]
+        ]
+        
+        # New rows - only for products that still exist and are active
+        new_ids = [product_id for product_id in desired if product_id not in existing]
+        to_create = []
+        if new_ids:
+            valid_ids = Product.objects.filter(
+                id__in=new_ids, is_active=True
+            ).values_list('id', flat=True)
+            to_create = [
+                UserCart(user=user, product_id=product_id, quantity=desired[product_id])
+                for product_id in valid_ids
+            ]
+        
+        if not (to_delete or to_update or to_create):
+            return False
+        
+        if to_delete:
+            UserCart.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            UserCart.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+        if to_create:
+            UserCart.objects.bulk_create(to_create)
+    
+    return True
 
 
 def load_cart_from_database(user):
@@ -46,61 +102,145 @@ def load_cart_from_database(user):
     return cart
 
 
-def validate_and_clean_cart(user, cart_dict):
+CATALOG_VERSION_CACHE_KEY = 'shop:catalog_price_version'
+
+
+def get_catalog_version():
     """
-    Validate cart against current stock and product availability.
-    Returns: (cleaned_cart, changes_made, change_messages)
+    Return the current catalog price/stock version stamp.
+    A fresh stamp is created if the cache lost it, which simply forces
+    cached cart summaries to be recomputed.
+    """
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached cart summary after a price or stock change."""
+    cache.set(CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+# Columns needed to validate and price a cart line
+CART_PRODUCT_FIELDS = ('id', 'name', 'slug', 'stock', 'is_active', 'price', 'discount_price')
+
+
+def get_cart_products(product_ids):
+    """Fetch all active products referenced by a cart in one query, keyed by string ID."""
+    ids = []
+    for product_id in product_ids:
+        try:
+            ids.append(int(product_id))
+        except (ValueError, TypeError):
+            continue
+    if not ids:
+        return {}
+    products = Product.objects.filter(id__in=ids, is_active=True).only(*CART_PRODUCT_FIELDS)
+    return {str(product.id): product for product in products}
+
+
+def build_cart_item(product, quantity):
+    """Build a priced cart line for display and totals."""
+    price = product.current_price
+    return {
+        'product': product,
+        'quantity': quantity,
+        'price': price,
+        'subtotal': price * quantity,
+    }
+
+
+def validate_and_price_cart(cart_dict, products=None):
+    """
+    Validate cart against current stock and availability and price it in one pass.
+    All referenced products are fetched with a single query unless an already
+    loaded {product_id: Product} mapping is passed in.
+    Returns: (cleaned_cart, changes_made, change_messages, cart_items)
     """
     if not cart_dict:
-        return {}, False, []
+        return {}, False, [], []
     
+    if products is None:
+        products = get_cart_products(cart_dict.keys())
     cleaned_cart = {}
+    cart_items = []
     changes_made = False
     change_messages = []
+    missing_reported = False
     
     for product_id, quantity in cart_dict.items():
-        try:
-            product = Product.objects.get(id=product_id, is_active=True)
-            
-            # Check if product is still available
-            if not product.is_active:
-                changes_made = True
-                change_messages.append(f"'{product.name}' is no longer available and was removed from your cart.")
-                continue
-            
-            # Check stock availability
-            available_stock = product.stock
-            if quantity > available_stock:
-                if available_stock > 0:
-                    # Reduce quantity to available stock
-                    cleaned_cart[product_id] = available_stock
-                    changes_made = True
-                    change_messages.append(f"'{product.name}' quantity reduced from {quantity} to {available_stock} (limited stock).")
-                else:
-                    # Remove item - out of stock
-                    changes_made = True
-                    change_messages.append(f"'{product.name}' is out of stock and was removed from your cart.")
-            else:
-                # Keep original quantity
-                cleaned_cart[product_id] = quantity
-                
-        except Product.DoesNotExist:
-            # Product no longer exists
+        product = products.get(str(product_id))
+        if product is None:
+            # Product no longer exists or is inactive
+            changes_made = True
+            if not missing_reported:
+                change_messages.append("Some items in your cart are no longer available and were removed.")
+                missing_reported = True
+            continue
+        
+        # Check stock availability
+        available_stock = product.stock
+        if quantity > available_stock:
             changes_made = True
-            change_messages.append("Some items in your cart are no longer available and were removed.")
+            if available_stock > 0:
+                # Reduce quantity to available stock
+                change_messages.append(f"'{product.name}' quantity reduced from {quantity} to {available_stock} (limited stock).")
+                quantity = available_stock
+            else:
+                # Remove item - out of stock
+                change_messages.append(f"'{product.name}' is out of stock and was removed from your cart.")
+                continue
+        
+        cleaned_cart[product_id] = quantity
+        cart_items.append(build_cart_item(product, quantity))
     
+    return cleaned_cart, changes_made, change_messages, cart_items
+
+
+def validate_and_clean_cart(user, cart_dict):
+    """
+    Validate cart against current stock and product availability.
+    Returns: (cleaned_cart, changes_made, change_messages)
+    """
+    cleaned_cart, changes_made, change_messages, cart_items = validate_and_price_cart(cart_dict)
     return cleaned_cart, changes_made, change_messages
 
 
-def clean_expired_carts(days=30):
+def clean_expired_carts(days=30, batch_size=1000, sleep=0, start_after_pk=0, progress=None):
     """
     Remove cart items older than specified days.
     Call this from a management command or scheduled task.
+
+    Rows are deleted in primary-key-ordered chunks of batch_size, sleeping
+    `sleep` seconds between chunks, so each DELETE holds short locks. Pass
+    start_after_pk to resume an interrupted run; progress(deleted, last_pk)
+    is called after every chunk.
+    Returns the number of deleted cart items.
     """
     cutoff_date = timezone.now() - timedelta(days=days)
     expired_items = UserCart.objects.filter(updated_at__lt=cutoff_date)
-    count = expired_items.count()
-    expired_items.delete()
+    last_pk = start_after_pk
+    count = 0
+    
+    while True:
+        pks = list(
+            expired_items.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        # Re-check the cutoff: rows updated since the SELECT are kept
+        deleted, _ = expired_items.filter(pk__in=pks).delete()
+        count += deleted
+        last_pk = pks[-1]
+        if progress:
+            progress(count, last_pk)
+        if len(pks) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+    
     return count
 
 
@@ -120,28 +260,147 @@ def clear_user_cart(user):
         UserCart.objects.filter(user=user).delete()
 
 
+def get_stored_cart(request):
+    """Return the cart of the current user as {product_id: quantity}."""
+    return get_cart_storage(request).get('cart', {})
+
+
+def get_cart_revision(request):
+    """Return the server-side revision of the stored cart."""
+    return get_cart_storage(request).get('cart_rev', 0)
+
+
+def store_cart(request, cart):
+    """Store cart (session or guest cookie), bumping the cart revision if its contents changed."""
+    storage = get_cart_storage(request)
+    if storage.get('cart', {}) != cart:
+        storage['cart_rev'] = storage.get('cart_rev', 0) + 1
+    storage['cart'] = cart
+
+
+def get_cart_flush_interval():
+    """Seconds between write-behind cart flushes (0 = write every change immediately)."""
+    return getattr(settings, 'CART_FLUSH_INTERVAL', 0)
+
+
+def persist_session_cart(request):
+    """
+    Persist the session cart for an authenticated user.
+
+    With write-behind enabled the session stays the source of truth: the
+    change is marked as pending and rows are only rewritten if the last
+    flush is older than CART_FLUSH_INTERVAL. Pending changes are flushed by
+    CartFlushMiddleware once due, on checkout, on logout, or by the
+    flush_pending_carts management command if the session is abandoned.
+    Returns True if database rows changed.
+    """
+    if not request.user.is_authenticated:
+        return False
+    if not get_cart_flush_interval():
+        return save_cart_to_database(request.user, get_stored_cart(request))
+    if not request.session.get('cart_dirty'):
+        mark_cart_pending(request)
+    request.session['cart_dirty'] = True
+    return flush_cart(request)
+
+
+def mark_cart_pending(request):
+    """Record the session for flush_pending_carts (once per clean -> dirty change)."""
+    session_key = request.session.session_key
+    if session_key:
+        PendingCartFlush.objects.bulk_create(
+            [PendingCartFlush(session_key=session_key, user=request.user)],
+            ignore_conflicts=True,
+        )
+
+
+def flush_cart(request, force=False):
+    """
+    Write pending session cart changes to the database if a flush is due.
+    With force=True the cart is written regardless of interval or pending state.
+    Returns True if database rows changed.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    session = request.session
+    if not force:
+        if not session.get('cart_dirty'):
+            return False
+        if time.time() - session.get('cart_flushed_at', 0) < get_cart_flush_interval():
+            return False
+    changed = save_cart_to_database(user, get_stored_cart(request))
+    session['cart_flushed_at'] = time.time()
+    if session.pop('cart_dirty', None) and session.session_key:
+        PendingCartFlush.objects.filter(session_key=session.session_key).delete()
+    return changed
+
+
 def sync_cart_on_login(request, user):
-    """Synchronize cart when user logs in with validation."""
+    """
+    Synchronize cart when user logs in with validation.
+
+    Reads the user's cart rows joined with their products once, merges and
+    validates in memory and writes the result back with a single upsert plus
+    one delete, all inside one transaction.
+    """
     if not user.is_authenticated:
         return
     
-    # Get session cart
-    session_cart = request.session.get('cart', {})
-    
-    # Get database cart
-    database_cart = load_cart_from_database(user)
+    # Get the guest cart (cookie, or session for older/oversized carts); right
+    # after login any cart state in the session is still the guest's
+    guest_storage = get_guest_cart_storage(request)
+    guest_storage.claim_session_cart()
+    session_cart = guest_storage.get('cart', {})
     
-    # Merge carts (session cart takes priority)
-    merged_cart = merge_carts(session_cart, database_cart)
-    
-    # Validate and clean the merged cart
-    cleaned_cart, changes_made, change_messages = validate_and_clean_cart(user, merged_cart)
-    
-    # Update session with cleaned cart
-    request.session['cart'] = cleaned_cart
+    with transaction.atomic():
+        # Get database cart together with its products
+        rows = list(
+            UserCart.objects.filter(user=user)
+            .select_related('product')
+            .only('id', 'product_id', 'quantity', *(f'product__{field}' for field in CART_PRODUCT_FIELDS))
+            .select_for_update(of=('self',))
+        )
+        products = {str(row.product_id): row.product for row in rows if row.product.is_active}
+        database_cart = {str(row.product_id): row.quantity for row in rows if row.product.is_active}
+        
+        # Only products added as a guest still need to be fetched
+        missing_ids = [product_id for product_id in session_cart if str(product_id) not in products]
+        if missing_ids:
+            products.update(get_cart_products(missing_ids))
+        
+        # Merge carts (session cart takes priority)
+        merged_cart = merge_carts(session_cart, database_cart)
+        
+        # Validate and clean the merged cart
+        cleaned_cart, changes_made, change_messages, cart_items = validate_and_price_cart(
+            merged_cart, products=products
+        )
+        
+        # Write back: upsert new/changed lines, delete the rest
+        existing = {str(row.product_id): row for row in rows}
+        now = timezone.now()
+        to_upsert = [
+            UserCart(user=user, product_id=int(product_id), quantity=quantity, updated_at=now)
+            for product_id, quantity in cleaned_cart.items()
+            if product_id not in existing or existing[product_id].quantity != quantity
+        ]
+        to_delete = [row.id for product_id, row in existing.items() if product_id not in cleaned_cart]
+        if to_upsert:
+            UserCart.objects.bulk_create(
+                to_upsert,
+                update_conflicts=True,
+                unique_fields=['user', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        if to_delete:
+            UserCart.objects.filter(id__in=to_delete).delete()
     
-    # Save cleaned cart to database
-    save_cart_to_database(user, cleaned_cart)
+    # Drop the guest cart and update session with cleaned cart
+    guest_storage.clear()
+    store_cart(request, cleaned_cart)
+    request.session['cart_flushed_at'] = time.time()
+    request.session.pop('cart_dirty', None)
     
     # Store change messages in session for display
     if change_messages:
@@ -151,13 +410,13 @@ def sync_cart_on_login(request, user):
 def sync_cart_on_logout(request, user):
     """Synchronize cart when user logs out."""
     if user.is_authenticated:
-        # Save current session cart to database
-        session_cart = request.session.get('cart', {})
-        save_cart_to_database(user, session_cart)
-    
-    # Keep session cart for anonymous browsing
-    # Don't clear the session cart so user can continue shopping
-    pass
+        # Save current session cart to database, including pending write-behind changes
+        flush_cart(request, force=True)
+        
+        # The cart stays with the account: don't hand it to guest storage,
+        # where the next login on this browser would merge it into another
+        # account. Drop any guest cart state as well.
+        get_guest_cart_storage(request).clear()
 
 
 def get_cart_change_messages(request):
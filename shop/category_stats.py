@@ -0,0 +1,137 @@
+"""
+Materialized per-category tree data: Category.descendant_ids (the category
+and every subcategory, active or not), Category.product_count (active
+products in that subtree) and Category.ancestor_path (id, name, slug and
+URL of every category from the root down, for breadcrumbs).
+
+Product saves and deletes adjust the counts incrementally with one UPDATE
+over the categories whose descendant_ids contain the old/new category; tree
+changes (category save/rename, delete, move) rebuild all columns after
+commit.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, F
+from django.urls import reverse
+from .models import Category, Product
+from .category_tree import bump_category_tree_version
+
+
+def compute_descendant_ids(rows):
+    """{id: sorted ids of the category and its subtree} from (id, parent_id) rows."""
+    children = defaultdict(list)
+    for category_id, parent_id in rows:
+        children[parent_id].append(category_id)
+
+    result = {}
+
+    def collect(category_id, seen):
+        ids = [category_id]
+        for child_id in children.get(category_id, ()):
+            if child_id not in seen:
+                seen.add(child_id)
+                ids.extend(collect(child_id, seen))
+        result[category_id] = sorted(ids)
+        return ids
+
+    for category_id, _ in rows:
+        if category_id not in result:
+            collect(category_id, {category_id})
+    return result
+
+
+def compute_ancestor_paths(categories):
+    """{id: [{'id', 'name', 'slug', 'url'}, ...] root first} for Category instances."""
+    by_id = {category.id: category for category in categories}
+    paths = {}
+
+    def path(category, seen=()):
+        if category.id not in paths:
+            entry = {
+                'id': category.id,
+                'name': category.name,
+                'slug': category.slug,
+                'url': reverse('category_or_product', kwargs={'slug': category.slug}),
+            }
+            parent = by_id.get(category.parent_id)
+            if parent is None or parent.id in seen:
+                paths[category.id] = [entry]
+            else:
+                paths[category.id] = path(parent, seen + (category.id,)) + [entry]
+        return paths[category.id]
+
+    for category in categories:
+        path(category)
+    return paths
+
+
+def rebuild_category_stats():
+    """Recompute descendant_ids, product_count and ancestor_path of every category."""
+    categories = list(Category.objects.only(
+        'id', 'parent_id', 'name', 'slug', 'descendant_ids', 'product_count', 'ancestor_path'
+    ))
+    descendants = compute_descendant_ids([(c.id, c.parent_id) for c in categories])
+    ancestor_paths = compute_ancestor_paths(categories)
+    direct_counts = dict(
+        Product.objects.filter(is_active=True, category__isnull=False)
+        .values_list('category').annotate(count=Count('id')).order_by()
+    )
+
+    changed = []
+    for category in categories:
+        ids = descendants[category.id]
+        count = sum(direct_counts.get(category_id, 0) for category_id in ids)
+        path = ancestor_paths[category.id]
+        if category.descendant_ids != ids or category.product_count != count or category.ancestor_path != path:
+            category.descendant_ids = ids
+            category.product_count = count
+            category.ancestor_path = path
+            changed.append(category)
+    # bulk_update sends no signals, so this doesn't retrigger the tree handlers
+    Category.objects.bulk_update(changed, ['descendant_ids', 'product_count', 'ancestor_path'], batch_size=500)
+    return len(changed)
+
+
+def refresh_category_stats():
+    """Rebuild all columns, then make every worker reload its category tree."""
+    rebuild_category_stats()
+    bump_category_tree_version()
+
+
+def adjust_product_count(category_id, delta):
+    """Add delta to the count of the category and all of its ancestors."""
+    if category_id is None or not delta:
+        return 0
+    return Category.objects.filter(descendant_ids__contains=[category_id]).update(
+        product_count=F('product_count') + delta
+    )
+
+
+def product_counts_changed(previous, current):
+    """
+    Apply a product's move between categories / (de)activation.
+    Both arguments are (category_id, is_active) or None; returns True if
+    any count changed.
+    """
+    before = previous[0] if previous and previous[1] else None
+    after = current[0] if current and current[1] else None
+    if before == after:
+        return False
+    adjust_product_count(before, -1)
+    adjust_product_count(after, 1)
+    return True
+
+
+def category_breadcrumbs(category):
+    """Breadcrumb entries ({'title', 'url'}) for a category's ancestor path, root first."""
+    if category is None:
+        return []
+    if category.ancestor_path:
+        return [{'title': entry['name'], 'url': entry['url']} for entry in category.ancestor_path]
+    # Not materialized yet (e.g. created in this transaction): walk the parents
+    trail = []
+    while category is not None:
+        trail.append({'title': category.name, 'url': reverse('category_or_product', kwargs={'slug': category.slug})})
+        category = category.parent
+    return trail[::-1]
@@ -0,0 +1,174 @@
+"""
+In-process snapshot of the active category tree.
+
+All active categories are loaded with one query into an immutable
+CategoryTree (parent/child links, ancestor chains, descendant id sets and
+product counts from shop.category_stats, slug index) that is shared by
+every request of the worker. A version stamp in the cache is bumped when a
+category is saved, deleted or moved, or a product count changes; the next
+request that sees a new stamp builds a fresh snapshot and swaps it in, while
+requests already holding the old one keep using it unchanged.
+
+The stamp only reaches every worker through a shared cache backend (see
+the shop.E001 deploy check in shop.apps). As a safety net a
+snapshot is also rebuilt once it is older than CATEGORY_TREE_MAX_AGE
+seconds, which bounds how long a missed bump can leave a worker stale.
+"""
+
+import threading
+import time
+import uuid
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Category
+
+CATEGORY_TREE_VERSION_CACHE_KEY = 'shop:category_tree_version'
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+class CategoryNode:
+    """Read-only category; templates can use it like a Category instance."""
+
+    __slots__ = ('id', 'name', 'slug', 'parent_id', 'product_count', 'children', 'ancestors', 'descendant_ids')
+
+    def __init__(self, id, name, slug, parent_id, product_count=0):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.product_count = product_count
+        self.children = ()
+        self.ancestors = ()
+        self.descendant_ids = frozenset()
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def parent(self):
+        return self.ancestors[-1] if self.ancestors else None
+
+    @property
+    def level(self):
+        return len(self.ancestors)
+
+    @property
+    def full_path(self):
+        return ' > '.join([ancestor.name for ancestor in self.ancestors] + [self.name])
+
+    def __str__(self):
+        if self.ancestors:
+            return f"{self.ancestors[-1].name} > {self.name}"
+        return self.name
+
+    def __repr__(self):
+        return f'<CategoryNode {self.id} {self.slug!r}>'
+
+
+class CategoryTree:
+    """
+    Immutable tree of the active categories. Children and roots are sorted
+    by name. Categories below an inactive parent are reachable by id/slug
+    (their ancestor chain stops there) but are not listed under the roots.
+    Descendant ids come from the materialized Category.descendant_ids
+    (which include inactive subcategories) when the rows carry them.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        nodes = {
+            row['id']: CategoryNode(row['id'], row['name'], row['slug'], row['parent_id'], row.get('product_count', 0))
+            for row in rows
+        }
+        materialized = {row['id']: row['descendant_ids'] for row in rows if row.get('descendant_ids')}
+
+        children = {}
+        tops = []
+        for node in nodes.values():
+            if node.parent_id in nodes:
+                children.setdefault(node.parent_id, []).append(node)
+            else:
+                tops.append(node)
+
+        def by_name(node):
+            return node.name.lower()
+
+        def link(node, ancestors):
+            node.ancestors = ancestors
+            kids = sorted(children.get(node.id, ()), key=by_name)
+            node.children = tuple(kids)
+            descendant_ids = {node.id}
+            for kid in kids:
+                descendant_ids |= link(kid, ancestors + (node,))
+            node.descendant_ids = frozenset(materialized.get(node.id, descendant_ids))
+            return descendant_ids
+
+        for node in tops:
+            link(node, ())
+
+        self.roots = tuple(sorted((node for node in tops if node.parent_id is None), key=by_name))
+        self.nodes = MappingProxyType(nodes)
+        self.by_slug = MappingProxyType({node.slug: node for node in nodes.values()})
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def get_by_slug(self, slug):
+        return self.by_slug.get(slug)
+
+    def descendant_ids(self, category_id):
+        """Ids of the category and its subcategories (empty if unknown)."""
+        node = self.nodes.get(category_id)
+        return node.descendant_ids if node else frozenset()
+
+    def ancestors(self, category_id):
+        node = self.nodes.get(category_id)
+        return node.ancestors if node else ()
+
+
+def get_category_tree_version():
+    """Current category tree version stamp (created if the cache lost it)."""
+    version = cache.get(CATEGORY_TREE_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CATEGORY_TREE_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATEGORY_TREE_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_category_tree_version():
+    """Make every worker rebuild its snapshot on the next request."""
+    cache.set(CATEGORY_TREE_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def load_category_tree(version=None):
+    rows = Category.objects.filter(is_active=True).values(
+        'id', 'name', 'slug', 'parent_id', 'descendant_ids', 'product_count'
+    )
+    return CategoryTree(list(rows), version)
+
+
+def _is_current(snapshot, version):
+    if snapshot is None or snapshot.version != version:
+        return False
+    max_age = getattr(settings, 'CATEGORY_TREE_MAX_AGE', None)
+    return not max_age or time.monotonic() - snapshot.loaded_at < max_age
+
+
+def get_category_tree():
+    """The worker's current snapshot, rebuilt when the version stamp changed or it expired."""
+    global _snapshot
+    version = get_category_tree_version()
+    snapshot = _snapshot
+    if not _is_current(snapshot, version):
+        with _snapshot_lock:
+            snapshot = _snapshot
+            if not _is_current(snapshot, version):
+                snapshot = load_category_tree(version)
+                _snapshot = snapshot
+    return snapshot
@@ -1,8 +1,8 @@
-from shop.models import Category
+from django.utils.functional import SimpleLazyObject
+from shop.category_tree import get_category_tree
 
 def top_categories(request):
+    # Root nodes of the shared category tree snapshot (no queries per render)
     return {
-        'top_categories': Category.objects.filter(parent=None, is_active=True).prefetch_related(
-            'children__children__children__children__children'  # Prefetch 5 levels deep for unlimited nesting
-        ).order_by('name')
-    } 
\ No newline at end of file
+        'top_categories': SimpleLazyObject(lambda: get_category_tree().roots)
+    }
@@ -150,5 +150,7 @@ class CheckoutShippingPaymentForm(forms.Form):
 class OrderSummaryForm(forms.Form):
     want_to_add_comment = forms.BooleanField(required=False, label=_('Chcę dodać komentarz'))
     order_comment = forms.CharField(required=False, widget=forms.Textarea, label=_('Komentarz do zamówienia'))
+    # Idempotency token - a replayed submission returns the existing order
+    order_token = forms.CharField(required=False, widget=forms.HiddenInput)
 
 
@@ -0,0 +1,89 @@
+"""
+Inventory reservation for order placement.
+
+Stock is decremented with conditional UPDATEs (stock = stock - q WHERE
+stock >= q) issued in ascending product-id order, so concurrent checkouts
+of the same products always lock rows in the same order and can never
+oversell.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from .models import Product, Order
+from .product_cards import sync_stock_flags
+
+
+class InsufficientStock(Exception):
+    """Raised when a product no longer has enough stock for a reservation."""
+
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(f"Insufficient stock for product {product_id} (requested {quantity})")
+
+
+def _aggregate_lines(lines):
+    """Sum quantities per product and return [(product_id, quantity)] in lock order."""
+    totals = defaultdict(int)
+    for product_id, quantity in lines:
+        totals[int(product_id)] += quantity
+    return sorted(totals.items())
+
+
+def reserve_stock(lines):
+    """
+    Atomically decrement stock for (product_id, quantity) lines.
+    Must run inside transaction.atomic(); raises InsufficientStock (rolling
+    the surrounding transaction back) if any line cannot be satisfied.
+    """
+    lines = _aggregate_lines(lines)
+    for product_id, quantity in lines:
+        updated = Product.objects.filter(
+            pk=product_id, is_active=True, stock__gte=quantity
+        ).update(stock=F('stock') - quantity)
+        if not updated:
+            raise InsufficientStock(product_id, quantity)
+    transaction.on_commit(lambda: sync_stock_flags(product_id for product_id, _ in lines))
+
+
+def release_order_stock(order, payment_status='failed'):
+    """
+    Return the stock reserved by an order, e.g. after a failed payment, and
+    mark the order cancelled. Safe to call more than once.
+    Returns True if stock was released.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order.pk)
+        if order.status == 'cancelled':
+            return False
+        lines = _aggregate_lines(order.items.values_list('product_id', 'quantity'))
+        for product_id, quantity in lines:
+            Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity)
+        order.status = 'cancelled'
+        order.payment_status = payment_status
+        order.save(update_fields=['status', 'payment_status', 'updated_at'])
+        transaction.on_commit(lambda: sync_stock_flags(product_id for product_id, _ in lines))
+    return True
+
+
+def confirm_order_payment(order, payment_status='succeeded'):
+    """
+    Record a successful payment. An order that was cancelled in the meantime
+    (e.g. expired checkout) takes its stock again; if that is no longer
+    available it stays cancelled with payment_status 'refund_required'.
+    Returns True if the order is confirmed.
+    """
+    try:
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.status == 'cancelled':
+                reserve_stock(order.items.values_list('product_id', 'quantity'))
+                order.status = 'pending'
+            order.payment_status = payment_status
+            order.save(update_fields=['status', 'payment_status', 'updated_at'])
+    except InsufficientStock:
+        Order.objects.filter(pk=order.pk).update(payment_status='refund_required')
+        return False
+    return True
@@ -4,6 +4,8 @@ Django management command to clean expired cart items.
 Usage:
 python manage.py clean_expired_carts
 python manage.py clean_expired_carts --days 60
+python manage.py clean_expired_carts --batch-size 500 --sleep 0.5
+python manage.py clean_expired_carts --start-after-pk 123456
 """
 
 from django.core.management.base import BaseCommand
@@ -26,6 +28,29 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of cart items deleted per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Seconds to pause between batches (default: 0.1)'
+        )
+        parser.add_argument(
+            '--start-after-pk',
+            type=int,
+            default=0,
+            help='Resume an interrupted run after this cart item ID'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Show current cart statistics (runs full-table aggregates)'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
@@ -44,8 +69,19 @@ class Command(BaseCommand):
                 )
             )
         else:
-            # Actually clean the carts
-            count = clean_expired_carts(days=days)
+            # Actually clean the carts, batch by batch
+            def report_progress(deleted, last_pk):
+                self.stdout.write(
+                    f'  - Deleted {deleted} cart items so far (resume with --start-after-pk {last_pk})'
+                )
+            
+            count = clean_expired_carts(
+                days=days,
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                start_after_pk=options['start_after_pk'],
+                progress=report_progress,
+            )
             
             if count > 0:
                 self.stdout.write(
@@ -58,6 +94,9 @@ class Command(BaseCommand):
                     self.style.SUCCESS('No expired cart items found')
                 )
         
+        if not options['stats']:
+            return
+        
         # Show current cart statistics
         from shop.models import UserCart
         total_carts = UserCart.objects.count()
@@ -71,4 +110,4 @@ class Command(BaseCommand):
         )
         self.stdout.write(
             f'  - Users with cart items: {unique_users}'
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,63 @@
+"""
+Django management command to flush write-behind cart changes left in sessions.
+
+Durable fallback for CART_FLUSH_INTERVAL: if a worker dies or a user never
+comes back before the next flush, the pending cart is still stored in the
+session. Schedule this command (e.g. every few minutes) to persist it.
+Only sessions recorded in PendingCartFlush are visited. Each one is handled
+with its session row locked, and the pending flag is only cleared if the
+cart revision is still the one that was saved. The record itself is removed
+on the next run that finds the session clean, so a request that saved a
+stale, still-dirty session in between is not missed.
+Requires a database-backed session engine.
+
+Usage:
+python manage.py flush_pending_carts
+"""
+
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from shop.cart_utils import save_cart_to_database
+from shop.models import PendingCartFlush
+
+
+class Command(BaseCommand):
+    help = 'Persist pending write-behind cart changes stored in active sessions'
+
+    def handle(self, *args, **options):
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        flushed = 0
+
+        pending = PendingCartFlush.objects.select_related('user').order_by('created_at')
+        for entry in pending.iterator():
+            with transaction.atomic():
+                # Requests saving this session wait until the flag is settled
+                session = Session.objects.select_for_update().filter(
+                    session_key=entry.session_key, expire_date__gt=timezone.now()
+                ).first()
+                data = session.get_decoded() if session else {}
+                if not data.get('cart_dirty') or str(entry.user_id) != str(data.get('_auth_user_id')):
+                    entry.delete()
+                    continue
+
+                revision = data.get('cart_rev', 0)
+                save_cart_to_database(entry.user, data.get('cart', {}))
+
+                # Clear the pending flag only if the cart is still the one just saved
+                store = SessionStore(session_key=session.session_key)
+                if store.get('cart_rev', 0) != revision:
+                    continue
+                store.pop('cart_dirty', None)
+                store['cart_flushed_at'] = time.time()
+                store.save()
+                flushed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Flushed pending carts for {flushed} sessions')
+        )
@@ -0,0 +1,25 @@
+"""
+Django management command to rebuild the materialized category data
+(Category.descendant_ids, product_count and ancestor_path).
+
+They are kept up to date by signals; run this after bulk imports, raw SQL
+changes to products or categories, or URL changes.
+
+Usage:
+python manage.py rebuild_category_stats
+"""
+
+from django.core.management.base import BaseCommand
+from shop.category_stats import rebuild_category_stats
+from shop.category_tree import bump_category_tree_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuild descendant IDs, active product counts and ancestor paths of all categories'
+
+    def handle(self, *args, **options):
+        changed = rebuild_category_stats()
+        bump_category_tree_version()
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated {changed} categories')
+        )
@@ -0,0 +1,31 @@
+"""
+Django management command to rebuild the ProductCard listing read model.
+
+Cards are kept in sync by signals; run this after bulk imports, raw SQL
+changes or media file moves (the thumbnail URL is resolved at build time).
+
+Usage:
+python manage.py rebuild_product_cards
+python manage.py rebuild_product_cards --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from shop.product_cards import refresh_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized product cards used by listing pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Products per upsert batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_product_cards(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {refreshed} product cards')
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-17 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; building the
+    # index this way doesn't block cart writes on the table
+    atomic = False
+
+    dependencies = [
+        ('shop', '0013_productimage_unique_primary_image_per_product'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='usercart',
+            index=models.Index(fields=['updated_at'], name='usercart_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='pipeline_status',
+            field=models.JSONField(blank=True, default=dict, verbose_name='pipeline status'),
+        ),
+    ]
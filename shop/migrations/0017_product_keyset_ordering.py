@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-17 15:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0016_order_pipeline_status'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'product', 'verbose_name_plural': 'products'},
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.2 on 2026-10-17 16:20
+
+import django.db.models.deletion
+import os
+from django.conf import settings
+from django.db import migrations, models
+from django.urls import reverse
+
+
+def populate_cards(apps, schema_editor):
+    """Initial fill; later changes are kept in sync by shop.product_cards."""
+    Category = apps.get_model('shop', 'Category')
+    Product = apps.get_model('shop', 'Product')
+    ProductCard = apps.get_model('shop', 'ProductCard')
+    # Keep in sync with shop.product_cards
+    placeholder_images = [
+        'https://images.unsplash.com/photo-1499636136210-6f4ee915583e?w=400&h=400&fit=crop',
+        'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
+        'https://images.unsplash.com/photo-1606312619070-d48b4c652a52?w=400&h=400&fit=crop',
+    ]
+
+    categories = {c.id: c for c in Category.objects.all()}
+
+    def path(category_id):
+        names = []
+        while category_id in categories:
+            names.append(categories[category_id].name)
+            category_id = categories[category_id].parent_id
+        return ' > '.join(reversed(names))
+
+    cards = []
+    for product in Product.objects.filter(is_active=True).prefetch_related('images'):
+        images = sorted(product.images.all(), key=lambda image: (image.order, image.created_at))
+        image = next((i for i in images if i.is_primary), images[0] if images else None)
+        image_url = ''
+        if image and image.image and os.path.exists(os.path.join(settings.MEDIA_ROOT, str(image.image))):
+            image_url = image.image.url
+        has_discount = product.discount_price is not None and product.discount_price < product.price
+        cards.append(ProductCard(
+            product=product,
+            category_id=product.category_id,
+            name=product.name,
+            slug=product.slug,
+            url=reverse('category_or_product', kwargs={'slug': product.slug}),
+            # Same as Product.current_price
+            price=product.discount_price if has_discount else product.price,
+            regular_price=product.price,
+            discount_percent=int((product.price - product.discount_price) / product.price * 100) if has_discount else 0,
+            image_url=image_url or placeholder_images[product.pk % len(placeholder_images)],
+            image_alt=((image.alt_text if image else '') or 'Homemade cookie')[:200],
+            in_stock=product.stock > 0,
+            category_path=path(product.category_id)[:500],
+            created_at=product.created_at,
+        ))
+    ProductCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0017_product_keyset_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='shop.product', verbose_name='product')),
+                ('name', models.CharField(max_length=200, verbose_name='name')),
+                ('slug', models.SlugField(max_length=200, verbose_name='slug')),
+                ('url', models.CharField(max_length=255, verbose_name='URL')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='current price')),
+                ('regular_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='regular price')),
+                ('discount_percent', models.PositiveSmallIntegerField(default=0, verbose_name='discount %')),
+                ('image_url', models.CharField(max_length=500, verbose_name='image URL')),
+                ('image_alt', models.CharField(blank=True, max_length=200, verbose_name='image alt text')),
+                ('in_stock', models.BooleanField(default=False, verbose_name='in stock')),
+                ('category_path', models.CharField(blank=True, max_length=500, verbose_name='category path')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_cards', to='shop.category', verbose_name='category')),
+            ],
+            options={
+                'verbose_name': 'product card',
+                'verbose_name_plural': 'product cards',
+                'ordering': ['-created_at', '-product_id'],
+                'indexes': [models.Index(fields=['-created_at', '-product'], name='productcard_created_idx'), models.Index(fields=['category', '-created_at'], name='productcard_category_idx')],
+            },
+        ),
+        migrations.RunPython(populate_cards, migrations.RunPython.noop),
+    ]
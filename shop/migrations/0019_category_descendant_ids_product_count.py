@@ -0,0 +1,57 @@
+# Generated by Django 5.2.2 on 2026-10-17 17:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Category = apps.get_model('shop', 'Category')
+    Product = apps.get_model('shop', 'Product')
+
+    categories = list(Category.objects.all())
+    children = defaultdict(list)
+    for category in categories:
+        children[category.parent_id].append(category.id)
+
+    def subtree(category_id):
+        ids = [category_id]
+        for child_id in children.get(category_id, ()):
+            ids.extend(subtree(child_id))
+        return ids
+
+    direct_counts = dict(
+        Product.objects.filter(is_active=True, category__isnull=False)
+        .values_list('category').annotate(count=Count('id')).order_by()
+    )
+    for category in categories:
+        category.descendant_ids = sorted(subtree(category.id))
+        category.product_count = sum(direct_counts.get(i, 0) for i in category.descendant_ids)
+    Category.objects.bulk_update(categories, ['descendant_ids', 'product_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0018_productcard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='descendant_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None, verbose_name='descendant IDs'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='active products'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['descendant_ids'], name='category_descendants_gin'),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.2 on 2026-10-17 17:40
+
+from django.db import migrations, models
+from django.urls import reverse
+
+
+def populate_ancestor_paths(apps, schema_editor):
+    Category = apps.get_model('shop', 'Category')
+    categories = {category.id: category for category in Category.objects.all()}
+
+    def path(category):
+        entry = {
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'url': reverse('category_or_product', kwargs={'slug': category.slug}),
+        }
+        parent = categories.get(category.parent_id)
+        return (path(parent) if parent else []) + [entry]
+
+    for category in categories.values():
+        category.ancestor_path = path(category)
+    Category.objects.bulk_update(categories.values(), ['ancestor_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_category_descendant_ids_product_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='ancestor_path',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='ancestor path'),
+        ),
+        migrations.RunPython(populate_ancestor_paths, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.urls import reverse
@@ -26,6 +28,17 @@ class Category(MPTTModel if MPTT_AVAILABLE else models.Model):
         verbose_name=_('parent category')
     )
     is_active = models.BooleanField(_('is active'), default=True)
+    # Maintained by shop.category_stats
+    descendant_ids = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name=_('descendant IDs')
+    )
+    product_count = models.PositiveIntegerField(_('active products'), default=0, editable=False)
+    # [{'id', 'name', 'slug', 'url'}, ...] from the root down to this category
+    ancestor_path = models.JSONField(_('ancestor path'), default=list, blank=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -33,13 +46,18 @@ class Category(MPTTModel if MPTT_AVAILABLE else models.Model):
         verbose_name = _('category')
         verbose_name_plural = _('categories')
         ordering = ['tree_id', 'lft'] if MPTT_AVAILABLE else ['name']
+        indexes = [
+            GinIndex(fields=['descendant_ids'], name='category_descendants_gin'),
+        ]
 
     if MPTT_AVAILABLE:
         class MPTTMeta:
             order_insertion_by = ['name']
 
     def __str__(self):
-        if self.parent:
+        if len(self.ancestor_path) > 1:
+            return f"{self.ancestor_path[-2]['name']} > {self.name}"
+        if self.parent_id and not self.ancestor_path:
             return f"{self.parent.name} > {self.name}"
         return self.name
 
@@ -54,13 +72,20 @@ class Category(MPTTModel if MPTT_AVAILABLE else models.Model):
     @property
     def full_path(self):
         """Returns the full category path as a string"""
-        if self.parent:
-            return f"{self.parent.full_path} > {self.name}"
-        return self.name
+        if self.ancestor_path:
+            return ' > '.join([entry['name'] for entry in self.ancestor_path[:-1]] + [self.name])
+        names = []
+        category = self
+        while category:
+            names.append(category.name)
+            category = category.parent
+        return ' > '.join(reversed(names))
 
     @property
     def level(self):
         """Returns the nesting level of the category"""
+        if self.ancestor_path:
+            return len(self.ancestor_path) - 1
         level = 0
         parent = self.parent
         while parent:
@@ -96,7 +121,9 @@ class Product(models.Model):
     class Meta:
         verbose_name = _('product')
         verbose_name_plural = _('products')
-        ordering = ['-created_at']
+        # id breaks ties so keyset (cursor) pagination is stable; listings page
+        # over ProductCard, whose productcard_created_idx serves that order
+        ordering = ['-created_at', '-id']
 
     def __str__(self):
         return self.name
@@ -111,8 +138,8 @@ class Product(models.Model):
 
     @property
     def current_price(self):
-        """Returns the current price (discount price if available, otherwise regular price)"""
-        return self.discount_price if self.discount_price else self.price
+        """Returns the current price (discount price if it is lower, otherwise regular price)"""
+        return self.discount_price if self.has_discount else self.price
 
     @property
     def has_discount(self):
@@ -209,6 +236,57 @@ class ProductImage(models.Model):
             ProductImage.objects.filter(product=self.product, is_primary=True).exclude(pk=self.pk).update(is_primary=False)
         super().save(*args, **kwargs)
 
+class ProductCard(models.Model):
+    """
+    Listing read model: one row per active product holding everything a
+    product card shows. Maintained by shop.product_cards on Product,
+    ProductImage and Category changes.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name=_('product')
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='product_cards',
+        verbose_name=_('category')
+    )
+    name = models.CharField(_('name'), max_length=200)
+    slug = models.SlugField(_('slug'), max_length=200)
+    url = models.CharField(_('URL'), max_length=255)
+    price = models.DecimalField(_('current price'), max_digits=10, decimal_places=2)
+    regular_price = models.DecimalField(_('regular price'), max_digits=10, decimal_places=2)
+    discount_percent = models.PositiveSmallIntegerField(_('discount %'), default=0)
+    image_url = models.CharField(_('image URL'), max_length=500)
+    image_alt = models.CharField(_('image alt text'), max_length=200, blank=True)
+    in_stock = models.BooleanField(_('in stock'), default=False)
+    category_path = models.CharField(_('category path'), max_length=500, blank=True)
+    # Copied from the product for ordering and cursor pagination
+    created_at = models.DateTimeField(_('created at'))
+
+    class Meta:
+        verbose_name = _('product card')
+        verbose_name_plural = _('product cards')
+        ordering = ['-created_at', '-product_id']
+        indexes = [
+            models.Index(fields=['-created_at', '-product'], name='productcard_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='productcard_category_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def has_discount(self):
+        """Only a sale price below the regular price is a discount (see build_card)."""
+        return self.price < self.regular_price
+
 class ShippingMethod(models.Model):
     name = models.CharField(_('name'), max_length=100)
     price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
@@ -314,6 +392,20 @@ class Order(models.Model):
         decimal_places=2,
         default=0
     )
+    idempotency_key = models.CharField(
+        _('idempotency key'),
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
+    # Post-order pipeline progress: {stage: {'status': ..., 'at': ..., ...}}
+    pipeline_status = models.JSONField(
+        _('pipeline status'),
+        default=dict,
+        blank=True
+    )
     
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
@@ -394,6 +486,9 @@ class UserCart(models.Model):
         verbose_name = _('user cart item')
         verbose_name_plural = _('user cart items')
         unique_together = ['user', 'product']
+        indexes = [
+            models.Index(fields=['updated_at'], name='usercart_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} for {self.user.email}"
@@ -401,5 +496,27 @@ class UserCart(models.Model):
     @property
     def total_price(self):
         """Calculate the total price for this cart item"""
-        price = self.product.discount_price or self.product.price
-        return self.quantity * price
+        return self.quantity * self.product.current_price
+
+
+class PendingCartFlush(models.Model):
+    """
+    Session holding write-behind cart changes not yet written to UserCart.
+    Added when a session's cart becomes dirty; flush_pending_carts only
+    visits these sessions.
+    """
+    session_key = models.CharField(_('session key'), max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='pending_cart_flushes',
+        verbose_name=_('user')
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('pending cart flush')
+        verbose_name_plural = _('pending cart flushes')
+
+    def __str__(self):
+        return f"Pending cart of {self.user_id} ({self.session_key})"
@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with WHERE (created_at, id) < (last seen) instead of
+OFFSET, so every page costs the same as the first one and no COUNT(*) is
+needed. Cursors are opaque URL-safe tokens; an approximate total can be
+taken from the PostgreSQL planner estimate.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, created_at, pk):
+    raw = json.dumps([direction, created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, created_at, pk); raises InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ('n', 'p') or created_at is None or not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return direction, created_at, pk
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """Paginate a queryset newest first on (created_at, id)."""
+
+    def __init__(self, queryset, per_page, field='created_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+
+    def _key(self, obj):
+        return getattr(obj, self.field), obj.pk
+
+    def page(self, cursor=None):
+        """Return the page after/before `cursor` (first page when missing or invalid)."""
+        direction = None
+        if cursor:
+            try:
+                direction, created_at, pk = decode_cursor(cursor)
+            except InvalidCursor:
+                direction = None
+
+        field = self.field
+        if direction == 'p':
+            # Walk backwards (oldest first) and flip the result
+            rows = list(
+                self.queryset.filter(
+                    Q(**{f'{field}__gt': created_at}) | Q(**{field: created_at, 'pk__gt': pk})
+                ).order_by(field, 'pk')[:self.per_page + 1]
+            )
+            has_more_before = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_more_after = True
+        else:
+            queryset = self.queryset.order_by(f'-{field}', '-pk')
+            if direction == 'n':
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': created_at}) | Q(**{field: created_at, 'pk__lt': pk})
+                )
+            rows = list(queryset[:self.per_page + 1])
+            has_more_after = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_more_before = direction == 'n'
+
+        next_cursor = previous_cursor = None
+        if rows and has_more_after:
+            next_cursor = encode_cursor('n', *self._key(rows[-1]))
+        if rows and has_more_before:
+            previous_cursor = encode_cursor('p', *self._key(rows[0]))
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def approximate_count(queryset, timeout=300):
+    """
+    Row estimate from the PostgreSQL planner (no COUNT(*) scan), cached per
+    query; exact count on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.values('pk').order_by().query.sql_with_params()
+    cache_key = 'approx_count:' + hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest()
+    estimate = cache.get(cache_key)
+    if estimate is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        cache.set(cache_key, estimate, timeout)
+    return estimate
@@ -0,0 +1,162 @@
+"""
+Maintenance of the ProductCard listing read model.
+
+Cards are rebuilt after commit whenever a product, one of its images or a
+category on its path changes, so listing pages render from a single narrow
+query without touching images, the filesystem or reverse().
+"""
+
+import os
+
+from django.conf import settings
+from django.db import transaction
+from .models import Category, Product, ProductCard
+
+# Shown when a product has no (existing) image
+PLACEHOLDER_IMAGES = [
+    'https://images.unsplash.com/photo-1499636136210-6f4ee915583e?w=400&h=400&fit=crop',
+    'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
+    'https://images.unsplash.com/photo-1606312619070-d48b4c652a52?w=400&h=400&fit=crop',
+]
+PLACEHOLDER_ALT_TEXTS = [
+    'Delicious chocolate chip cookie',
+    'Fresh baked cookie',
+    'Homemade cookie',
+    'Sweet cookie treat',
+    'Yummy cookie',
+]
+
+
+def primary_image(images):
+    """Primary image from a prefetched image list, else the first one."""
+    for image in images:
+        if image.is_primary:
+            return image
+    return images[0] if images else None
+
+
+def category_paths():
+    """{category id: 'Parent > Child'} using one query over all categories."""
+    categories = {
+        category['id']: category
+        for category in Category.objects.values('id', 'name', 'parent_id')
+    }
+    paths = {}
+
+    def path(category_id):
+        if category_id not in paths:
+            category = categories[category_id]
+            parent_id = category['parent_id']
+            paths[category_id] = (
+                f"{path(parent_id)} > {category['name']}" if parent_id in categories else category['name']
+            )
+        return paths[category_id]
+
+    return {category_id: path(category_id) for category_id in categories}
+
+
+def build_card(product, paths):
+    image = primary_image(list(product.images.all()))
+    image_url = ''
+    if image and image.image:
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, str(image.image))):
+            image_url = image.image.url
+    if not image_url:
+        image_url = PLACEHOLDER_IMAGES[product.pk % len(PLACEHOLDER_IMAGES)]
+    image_alt = (image.alt_text if image else '') or PLACEHOLDER_ALT_TEXTS[product.pk % len(PLACEHOLDER_ALT_TEXTS)]
+
+    return ProductCard(
+        product=product,
+        category_id=product.category_id,
+        name=product.name,
+        slug=product.slug,
+        url=product.get_absolute_url(),
+        price=product.current_price,
+        regular_price=product.price,
+        discount_percent=product.discount_percentage,
+        image_url=image_url,
+        image_alt=image_alt[:200],
+        in_stock=product.stock > 0,
+        category_path=paths.get(product.category_id, '')[:500],
+        created_at=product.created_at,
+    )
+
+
+CARD_FIELDS = [
+    'category', 'name', 'slug', 'url', 'price', 'regular_price', 'discount_percent',
+    'image_url', 'image_alt', 'in_stock', 'category_path', 'created_at',
+]
+
+
+def refresh_product_cards(product_ids=None, batch_size=500):
+    """
+    Rebuild the cards of the given products (all products when None):
+    upsert active ones, delete cards of inactive or deleted products.
+    """
+    products = Product.objects.prefetch_related('images').order_by('pk')
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        products = products.filter(pk__in=product_ids)
+
+    paths = category_paths()
+    refreshed = 0
+    active_ids = set()
+    batch = []
+    for product in products.filter(is_active=True).iterator(chunk_size=batch_size):
+        active_ids.add(product.pk)
+        batch.append(build_card(product, paths))
+        if len(batch) >= batch_size:
+            refreshed += _upsert(batch)
+            batch = []
+    if batch:
+        refreshed += _upsert(batch)
+
+    stale = ProductCard.objects.all()
+    if product_ids is not None:
+        stale = stale.filter(product_id__in=product_ids)
+    stale.exclude(product_id__in=active_ids).delete()
+    return refreshed
+
+
+def _upsert(cards):
+    ProductCard.objects.bulk_create(
+        cards,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=CARD_FIELDS,
+    )
+    return len(cards)
+
+
+def refresh_category_cards(category):
+    """Rebuild cards of products in a category and its subcategories (path/name change)."""
+    categories = category.get_descendants(include_self=True)
+    product_ids = Product.objects.filter(category__in=categories).values_list('pk', flat=True)
+    refresh_product_cards(list(product_ids))
+
+
+def sync_stock_flags(product_ids):
+    """Update in_stock after stock changed through queryset updates (no signals)."""
+    cards = ProductCard.objects.filter(product_id__in=list(product_ids))
+    cards.filter(in_stock=True, product__stock=0).update(in_stock=False)
+    cards.filter(in_stock=False, product__stock__gt=0).update(in_stock=True)
+
+
+def refresh_uncategorized_cards():
+    """Products left without a category after a category was deleted."""
+    refresh_product_cards(list(Product.objects.filter(category=None).values_list('pk', flat=True)))
+
+
+def schedule_product_refresh(product_id):
+    """Refresh one product's card once the current transaction commits."""
+    transaction.on_commit(lambda: refresh_product_cards([product_id]))
+
+
+def schedule_category_refresh(category):
+    transaction.on_commit(lambda: refresh_category_cards(category))
+
+
+def schedule_uncategorized_refresh():
+    transaction.on_commit(refresh_uncategorized_cards)
@@ -0,0 +1,116 @@
+"""
+Shop signals and handlers: cached shop data, the category tree snapshot,
+materialized category stats and the product-card read model are kept in
+sync with catalog changes, and placed orders start the post-order pipeline.
+"""
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+from .models import Category, Product, ProductImage, MPTT_AVAILABLE
+from .cart_utils import bump_catalog_version
+from .category_tree import bump_category_tree_version
+from .category_stats import adjust_product_count, product_counts_changed, refresh_category_stats
+from .product_cards import schedule_category_refresh, schedule_product_refresh, schedule_uncategorized_refresh
+
+
+# Stored values compared on save: placement (category counts) and pricing (cart summaries)
+TRACKED_PRODUCT_FIELDS = ('category', 'is_active', 'price', 'discount_price')
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored (category, is_active, price, discount_price) of the product."""
+    instance.__dict__.pop('_previous_state', None)
+    if raw or (update_fields is not None and not set(TRACKED_PRODUCT_FIELDS) & set(update_fields)):
+        return
+    instance._previous_state = (
+        Product.objects.filter(pk=instance.pk)
+        .values_list('category_id', 'is_active', 'price', 'discount_price').first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_changed(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Cached cart summaries only hold count and total, so they are invalidated
+    when a product's price or availability changes, not on stock updates.
+    Category counts follow a move between categories or a (de)activation.
+    """
+    if raw or '_previous_state' not in instance.__dict__:
+        return
+    previous = instance.__dict__.pop('_previous_state')
+    if created or previous is None or (previous[1], previous[2], previous[3]) != (
+        instance.is_active, instance.price, instance.discount_price
+    ):
+        transaction.on_commit(bump_catalog_version)
+    if product_counts_changed(previous and previous[:2], (instance.category_id, instance.is_active)):
+        transaction.on_commit(bump_category_tree_version)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=Product)
+def product_removed(sender, instance, **kwargs):
+    if instance.is_active and instance.category_id:
+        adjust_product_count(instance.category_id, -1)
+        transaction.on_commit(bump_category_tree_version)
+
+
+@receiver(post_save, sender=Product)
+def product_card_changed(sender, instance, raw=False, **kwargs):
+    """Rebuild the product's listing card (deleted cards go with the product)."""
+    if not raw:
+        schedule_product_refresh(instance.pk)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, raw=False, **kwargs):
+    """The product's card thumbnail may have changed."""
+    if not raw:
+        schedule_product_refresh(instance.product_id)
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    """Renames and moves change the category path of cards in the subtree."""
+    if not raw:
+        schedule_category_refresh(instance)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    schedule_uncategorized_refresh()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_tree_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(refresh_category_stats)
+
+
+if MPTT_AVAILABLE:
+    from mptt.signals import node_moved
+
+    @receiver(node_moved, sender=Category)
+    def category_moved(sender, instance, **kwargs):
+        """Drag-and-drop moves in the admin update the tree without post_save."""
+        transaction.on_commit(refresh_category_stats)
+        schedule_category_refresh(instance)
+
+
+# Sent with `order=` when an order is placed or its payment succeeds
+order_placed = Signal()
+
+
+@receiver(order_placed)
+def start_order_pipeline(sender, order, **kwargs):
+    """Run the post-order pipeline in the background."""
+    from .tasks import run_order_stage
+    run_order_stage.delay(order.id)
@@ -0,0 +1,154 @@
+"""
+Post-order pipeline.
+
+The order_placed signal (sent by place_order and by payment modules once a
+payment succeeds) enqueues the pipeline. Each stage runs as its own
+retryable background job, records its outcome in Order.pipeline_status and
+then enqueues the next stage, so the checkout response returns as soon as
+the order row commits.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.translation import gettext as _
+from home.mailer import send_email
+from jobs.queue import task, STALE_JOB_TIMEOUT
+from .inventory import release_order_stock
+from .models import Order, Product
+
+
+def send_confirmation_email(order):
+    if not order.customer_email:
+        return 'skipped'
+    items = list(order.items.select_related('product'))
+    html_message = render_to_string('shop/emails/order_confirmation.html', {'order': order, 'items': items})
+    send_email(
+        subject=_('Order #%(order_id)s - Misamisa') % {'order_id': order.id},
+        message=strip_tags(html_message),
+        recipient_list=[order.customer_email],
+        html_message=html_message,
+    )
+    return 'done'
+
+
+def notify_admins(order):
+    recipients = getattr(settings, 'ORDER_NOTIFICATION_EMAILS', [])
+    if not recipients:
+        return 'skipped'
+    send_email(
+        subject=f'New order #{order.id} ({order.total_amount} zł)',
+        message=f'Order #{order.id} from {order.customer_name} <{order.customer_email}>, '
+                f'payment: {order.payment_method_name} ({order.payment_status}).',
+        from_email=None,
+        recipient_list=recipients,
+    )
+    return 'done'
+
+
+def sync_stock(order):
+    # Stock was reserved at checkout; record the products now running low
+    threshold = getattr(settings, 'LOW_STOCK_THRESHOLD', 5)
+    low_stock = list(
+        Product.objects.filter(
+            id__in=order.items.values('product_id'), stock__lte=threshold
+        ).values_list('id', flat=True)
+    )
+    return {'status': 'done', 'low_stock': low_stock}
+
+
+def follow_up_payment(order):
+    if order.payment_status not in ('succeeded', 'paid'):
+        # Re-run when the payment module reports success
+        return 'waiting'
+    if order.status == 'pending':
+        Order.objects.filter(pk=order.pk, status='pending').update(status='paid', updated_at=timezone.now())
+    return 'done'
+
+
+# A stage found running in another job is retried after this delay
+STAGE_BUSY_RETRY_DELAY = timedelta(seconds=30)
+
+# Ordered pipeline stages
+ORDER_PIPELINE = [
+    ('confirmation_email', send_confirmation_email),
+    ('admin_notification', notify_admins),
+    ('stock_sync', sync_stock),
+    ('payment_followup', follow_up_payment),
+]
+
+
+def record_stage(order_id, stage, status, **details):
+    """Store a stage outcome on the order (row-locked to avoid lost updates)."""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order_id)
+        pipeline_status = dict(order.pipeline_status or {})
+        pipeline_status[stage] = {'status': status, 'at': timezone.now().isoformat(), **details}
+        order.pipeline_status = pipeline_status
+        order.save(update_fields=['pipeline_status'])
+
+
+def claim_stage(order_id, stage):
+    """
+    Mark a stage running under the order's row lock. Returns the order and
+    the stage's previous status; the order is None if another job is
+    running the stage right now (a repeated order_placed or webhook).
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order_id)
+        pipeline_status = dict(order.pipeline_status or {})
+        previous = pipeline_status.get(stage, {})
+        if previous.get('status') in ('done', 'skipped'):
+            return order, previous['status']
+        if previous.get('status') == 'running':
+            started = datetime.fromisoformat(previous['at'])
+            # A stage left running by a worker that died is taken over
+            if timezone.now() - started < STALE_JOB_TIMEOUT:
+                return None, 'running'
+        pipeline_status[stage] = {'status': 'running', 'at': timezone.now().isoformat()}
+        order.pipeline_status = pipeline_status
+        order.save(update_fields=['pipeline_status'])
+        return order, previous.get('status')
+
+
+@task(queue='default', priority=5, max_attempts=5)
+def run_order_stage(order_id, index=0):
+    """Run one pipeline stage and enqueue the next one."""
+    if index >= len(ORDER_PIPELINE):
+        return
+    stage, handler = ORDER_PIPELINE[index]
+    order, previous = claim_stage(order_id, stage)
+    if order is None:
+        # Another job is running this stage, possibly on data from before this
+        # pipeline was started (e.g. payment_followup before the payment): try again shortly
+        run_order_stage.delay(order_id, index, _run_at=timezone.now() + STAGE_BUSY_RETRY_DELAY)
+        return
+    
+    if previous not in ('done', 'skipped'):
+        try:
+            result = handler(order)
+        except Exception as e:
+            record_stage(order_id, stage, 'failed', error=str(e))
+            raise
+        if isinstance(result, dict):
+            record_stage(order_id, stage, **result)
+        else:
+            record_stage(order_id, stage, result)
+    
+    run_order_stage.delay(order_id, index + 1)
+
+
+@task(queue='default', priority=3)
+def expire_unpaid_order(order_id):
+    """Cancel an order whose payment never completed and return its stock."""
+    with transaction.atomic():
+        # Locked, so a payment confirmed concurrently is not cancelled
+        order = Order.objects.select_for_update().filter(pk=order_id, status='pending').exclude(
+            payment_status__in=['succeeded', 'paid']
+        ).first()
+        if order:
+            release_order_stock(order, payment_status='expired')
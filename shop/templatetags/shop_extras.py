@@ -3,6 +3,7 @@ from django.templatetags.static import static
 from django.conf import settings
 import random
 import os
+from ..product_cards import PLACEHOLDER_IMAGES, PLACEHOLDER_ALT_TEXTS
 
 register = template.Library()
 
@@ -18,19 +19,7 @@ def get_product_image(product):
             return product.primary_image.image.url
     
     # Return a random cookie placeholder image if no image or file doesn't exist
-    cookie_images = [
-        'https://images.unsplash.com/photo-1499636136210-6f4ee915583e?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1606312619070-d48b4c652a52?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1499636136210-6f4ee915583e?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1606312619070-d48b4c652a52?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1499636136210-6f4ee915583e?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1606312619070-d48b4c652a52?w=400&h=400&fit=crop',
-        'https://images.unsplash.com/photo-1558961363-fa8fdf82db35?w=400&h=400&fit=crop',
-    ]
-    return random.choice(cookie_images)
+    return random.choice(PLACEHOLDER_IMAGES)
 
 @register.filter
 def get_product_alt_text(product):
@@ -40,16 +29,4 @@ def get_product_alt_text(product):
     if product.primary_image and product.primary_image.alt_text:
         return product.primary_image.alt_text
     else:
-        cookie_descriptions = [
-            'Delicious chocolate chip cookie',
-            'Fresh baked cookie',
-            'Homemade cookie',
-            'Sweet cookie treat',
-            'Yummy cookie',
-            'Fresh cookie',
-            'Delicious cookie',
-            'Baked cookie',
-            'Sweet treat cookie',
-            'Homemade treat cookie',
-        ]
-        return random.choice(cookie_descriptions) 
\ No newline at end of file
+        return random.choice(PLACEHOLDER_ALT_TEXTS) 
\ No newline at end of file
@@ -1,3 +1,166 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .category_stats import compute_descendant_ids, product_counts_changed
+from .models import Product
+from .pagination import CursorPaginator, InvalidCursor, decode_cursor, encode_cursor
+from .product_cards import build_card
+
+
+class CursorEncodingTests(SimpleTestCase):
+    def test_round_trip(self):
+        created_at = timezone.now().replace(microsecond=123456)
+        for direction in ('n', 'p'):
+            token = encode_cursor(direction, created_at, 42)
+            self.assertEqual(decode_cursor(token), (direction, created_at, 42))
+
+    def test_token_is_url_safe(self):
+        token = encode_cursor('n', timezone.now(), 7)
+        self.assertNotIn('=', token)
+        self.assertRegex(token, r'^[A-Za-z0-9_-]+$')
+
+    def test_invalid_cursors(self):
+        for token in ('', 'garbage!', encode_cursor('n', timezone.now(), 1)[:-4]):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+    def test_rejects_unknown_direction_and_non_integer_id(self):
+        now = timezone.now()
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor('x', now, 1))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor('n', now, '1'))
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now()
+        cls.products = []
+        for index in range(5):
+            product = Product.objects.create(name=f'Cookie {index}', price=Decimal('10.00'))
+            cls.products.append(product)
+        # Two products share a timestamp, so ties are broken by id
+        offsets = [5, 4, 3, 3, 1]
+        for product, offset in zip(cls.products, offsets):
+            Product.objects.filter(pk=product.pk).update(created_at=base - timedelta(minutes=offset))
+        # Newest first: created_at desc, id desc
+        cls.expected = [p.pk for p in Product.objects.order_by('-created_at', '-pk')]
+
+    def paginate(self, cursor=None):
+        return CursorPaginator(Product.objects.all(), 2).page(cursor)
+
+    def test_walks_forward_over_all_rows(self):
+        seen = []
+        page = self.paginate()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(product.pk for product in page)
+            if not page.has_next():
+                break
+            page = self.paginate(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), 1)
+        self.assertTrue(page.has_previous())
+
+    def test_previous_returns_the_earlier_page(self):
+        first = self.paginate()
+        second = self.paginate(first.next_cursor)
+        third = self.paginate(second.next_cursor)
+
+        back_to_second = self.paginate(third.previous_cursor)
+        self.assertEqual([p.pk for p in back_to_second], [p.pk for p in second])
+        self.assertTrue(back_to_second.has_next())
+
+        back_to_first = self.paginate(back_to_second.previous_cursor)
+        self.assertEqual([p.pk for p in back_to_first], [p.pk for p in first])
+        self.assertFalse(back_to_first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = self.paginate('not-a-cursor')
+        self.assertEqual([p.pk for p in page], self.expected[:2])
+        self.assertFalse(page.has_previous())
+
+    def test_empty_queryset(self):
+        page = CursorPaginator(Product.objects.none(), 2).page()
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next())
+        self.assertFalse(page.has_previous())
+
+
+class ProductCardPriceTests(TestCase):
+    def card_for(self, price, discount_price):
+        product = Product.objects.create(
+            name=f'Cookie {price} {discount_price}', price=Decimal(price),
+            discount_price=Decimal(discount_price) if discount_price else None,
+        )
+        return product, build_card(product, {})
+
+    def test_lower_discount_price(self):
+        product, card = self.card_for('20.00', '15.00')
+        self.assertEqual(card.price, Decimal('15.00'))
+        self.assertEqual(card.regular_price, Decimal('20.00'))
+        self.assertEqual(card.discount_percent, 25)
+        self.assertTrue(card.has_discount)
+        self.assertEqual(card.price, product.current_price)
+
+    def test_discount_price_not_below_price_is_ignored(self):
+        for discount_price in ('20.00', '25.00'):
+            product, card = self.card_for('20.00', discount_price)
+            self.assertEqual(card.price, Decimal('20.00'))
+            self.assertEqual(card.discount_percent, 0)
+            self.assertFalse(card.has_discount)
+            self.assertEqual(card.price, product.current_price)
+
+    def test_without_discount_price(self):
+        product, card = self.card_for('12.50', None)
+        self.assertEqual(card.price, Decimal('12.50'))
+        self.assertFalse(card.has_discount)
+        self.assertEqual(card.price, product.current_price)
+
+
+class CategoryStatsTests(SimpleTestCase):
+    def test_descendant_ids(self):
+        # 1 -> 2 -> 4, 1 -> 3, 5 (root)
+        rows = [(1, None), (2, 1), (3, 1), (4, 2), (5, None)]
+        self.assertEqual(compute_descendant_ids(rows), {
+            1: [1, 2, 3, 4],
+            2: [2, 4],
+            3: [3],
+            4: [4],
+            5: [5],
+        })
+
+    def test_descendant_ids_survive_cycles(self):
+        result = compute_descendant_ids([(1, 2), (2, 1)])
+        self.assertEqual(set(result), {1, 2})
+
+    @mock.patch('shop.category_stats.adjust_product_count')
+    def test_move_between_categories(self, adjust):
+        self.assertTrue(product_counts_changed((1, True), (2, True)))
+        adjust.assert_has_calls([mock.call(1, -1), mock.call(2, 1)])
+
+    @mock.patch('shop.category_stats.adjust_product_count')
+    def test_deactivation_and_activation(self, adjust):
+        self.assertTrue(product_counts_changed((1, True), (1, False)))
+        adjust.assert_has_calls([mock.call(1, -1), mock.call(None, 1)])
+        adjust.reset_mock()
+        self.assertTrue(product_counts_changed((1, False), (1, True)))
+        adjust.assert_has_calls([mock.call(None, -1), mock.call(1, 1)])
+
+    @mock.patch('shop.category_stats.adjust_product_count')
+    def test_new_product(self, adjust):
+        self.assertTrue(product_counts_changed(None, (3, True)))
+        adjust.assert_has_calls([mock.call(None, -1), mock.call(3, 1)])
+
+    @mock.patch('shop.category_stats.adjust_product_count')
+    def test_no_count_change(self, adjust):
+        self.assertFalse(product_counts_changed((1, True), (1, True)))
+        # Moving an inactive product doesn't touch any count
+        self.assertFalse(product_counts_changed((1, False), (2, False)))
+        self.assertFalse(product_counts_changed(None, (2, False)))
+        adjust.assert_not_called()
@@ -1,55 +1,50 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils.translation import gettext_lazy as _
-from .models import Category, Product
+from .models import Category, Product, ProductCard
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.urls import reverse
 from shop.models import ShippingMethod, PaymentMethod, Order, OrderItem
 from accounts.models import Address, CustomUser
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
+from django.db import transaction, IntegrityError
 import json
+import uuid
+from datetime import timedelta
 from django.contrib import messages
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Prefetch
 from modules.manager import module_manager
 from django.conf import settings
-from .cart_utils import save_cart_to_database, validate_and_clean_cart, get_cart_change_messages
+from django.core.cache import cache
+from .cart_utils import get_cart_change_messages, flush_cart
+from .cart_service import get_cart_service
+from .cart_storage import get_cart_storage
+from .inventory import reserve_stock, release_order_stock, InsufficientStock
+from .signals import order_placed
+from .tasks import expire_unpaid_order
 from .forms import CheckoutShippingPaymentForm, OrderSummaryForm
+from .pagination import CursorPaginator, approximate_count
+from .category_tree import get_category_tree
+from .category_stats import category_breadcrumbs
 
 
 def get_cart_items(request):
-    """Get cart items from session."""
-    cart = request.session.get('cart', {})
-    product_ids = list(cart.keys())
-    products = Product.objects.filter(id__in=product_ids, is_active=True)
-    cart_items = []
-    
-    for product in products:
-        qty = cart.get(str(product.id), 0)
-        price = product.discount_price or product.price
-        subtotal = price * qty
-        cart_items.append({
-            'product': product,
-            'quantity': qty,
-            'price': price,
-            'subtotal': subtotal,
-        })
-    
-    return cart_items
+    """Get priced cart items for the session cart (shared per request)."""
+    return get_cart_service(request).items
 
 
 def clear_cart(request):
     """Clear the cart from session."""
-    request.session['cart'] = {}
+    get_cart_service(request).clear()
 
 
 def product_list(request):
     """Display all active products (admin view)"""
-    products = Product.objects.filter(is_active=True).select_related('category')
+    products = ProductCard.objects.all()
     context = {
         'products': products,
         'title': _('All Products')
@@ -58,17 +53,14 @@ def product_list(request):
 
 def category_detail(request, slug):
     """Display products in a specific category"""
-    category = get_object_or_404(Category, slug=slug, is_active=True)
-    descendant_categories = category.get_descendants(include_self=True)
-    products = Product.objects.filter(
-        category__in=descendant_categories,
-        is_active=True
-    ).select_related('category')
-    
-    # Get hierarchical categories for sidebar
-    sidebar_categories = Category.objects.filter(parent=None, is_active=True).prefetch_related(
-        'children__children__children__children__children'  # Prefetch up to 6 levels for unlimited nesting
-    ).order_by('name')
+    tree = get_category_tree()
+    category = tree.get_by_slug(slug)
+    if category is None:
+        raise Http404
+    products = ProductCard.objects.filter(category_id__in=category.descendant_ids)
+    
+    # Hierarchical categories for sidebar
+    sidebar_categories = tree.roots
     
     context = {
         'category': category,
@@ -95,26 +87,34 @@ def product_list_public(request, category_slug=None):
     # Optimize category query - only fetch what we need
     categories = Category.objects.filter(is_active=True).values('id', 'name', 'slug').order_by('name')
     category = None
-    products = Product.objects.filter(is_active=True).select_related('category').prefetch_related(
-        'images'  # Prefetch product images
-    )
+    # Cards of active products, ready to render (see shop/product_cards.py)
+    products = ProductCard.objects.all()
     
     # Handle category filtering - first check parameter, then GET request
     if not category_slug:
         category_slug = request.GET.get('category')
     
+    tree = get_category_tree()
     if category_slug:
-        try:
-            category = Category.objects.get(slug=category_slug, is_active=True)
-            descendant_categories = category.get_descendants(include_self=True)
-            products = products.filter(category__in=descendant_categories)
-        except Category.DoesNotExist:
-            pass
+        category = tree.get_by_slug(category_slug)
+        if category is not None:
+            products = products.filter(category_id__in=category.descendant_ids)
 
     # Pagination - keep at 12 products per page
-    paginator = Paginator(products, 12)  # 12 products per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Cursor mode pages on (created_at, id) without COUNT(*)/OFFSET (used by "load more")
+    cursor_page = None
+    page_obj = None
+    approx_total = None
+    if 'cursor' in request.GET or getattr(settings, 'PRODUCT_LIST_PAGINATION', 'pages') == 'cursor':
+        cursor_page = CursorPaginator(products, 12).page(request.GET.get('cursor'))
+        if request.GET.get('total') == 'approx':
+            approx_total = approximate_count(products)
+        product_page = cursor_page.object_list
+    else:
+        paginator = Paginator(products, 12)  # 12 products per page
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        product_page = page_obj.object_list
     
     # Generate breadcrumbs
     breadcrumbs = [{'title': 'Misamisa', 'url': reverse('home')}]
@@ -128,12 +128,8 @@ def product_list_public(request, category_slug=None):
         title = _('All Products')
         breadcrumbs.append({'title': _('Shop'), 'url': reverse('shop:public_product_list')})
 
-    # Optimize sidebar categories - only fetch what's needed for display
-    sidebar_categories = Category.objects.filter(parent=None, is_active=True).prefetch_related(
-        Prefetch('children', queryset=Category.objects.filter(is_active=True).prefetch_related(
-            Prefetch('children', queryset=Category.objects.filter(is_active=True))
-        ))
-    ).order_by('name')[:10]  # Limit to first 10 top-level categories
+    # Sidebar categories from the shared tree snapshot
+    sidebar_categories = tree.roots[:10]  # Limit to first 10 top-level categories
     
     # Get view preference from headers (preferred), URL parameter (fallback), then default to 'grid'
     current_view = request.headers.get('X-View-Preference') or request.GET.get('view', 'grid')
@@ -141,8 +137,10 @@ def product_list_public(request, category_slug=None):
     context = {
         'categories': categories,
         'category': category,
-        'products': page_obj.object_list,
+        'products': product_page,
         'page_obj': page_obj,
+        'cursor_page': cursor_page,
+        'approx_total': approx_total,
         'title': title,
         'breadcrumbs': breadcrumbs,
         'sidebar_categories': sidebar_categories,
@@ -156,7 +154,10 @@ def product_list_public(request, category_slug=None):
         
         # HTMX request handling
         
-        if hx_target == '#main-content':
+        if cursor_page is not None and request.GET.get('fragment') == 'more':
+            # "Load more" - just the next cards and a new button
+            return render(request, 'shop/product_list_more.html', context)
+        elif hx_target == '#main-content':
             # Top menu navigation - return full shop layout without base template
             return render(request, 'shop/product_list_content.html', context)
         else:
@@ -166,19 +167,11 @@ def product_list_public(request, category_slug=None):
     return render(request, 'shop/product_list.html', context)
 
 def product_detail_public(request, slug):
-    product = get_object_or_404(Product, slug=slug, is_active=True)
+    product = get_object_or_404(Product.objects.select_related('category'), slug=slug, is_active=True)
     
-    # Generate breadcrumbs
+    # Generate breadcrumbs - the category chain comes from its materialized ancestor path
     breadcrumbs = [{'title': 'Misamisa', 'url': reverse('home')}]
-    # Add full category parent chain
-    parent_chain = []
-    current = product.category
-    while current.parent:
-        parent_chain.append(current.parent)
-        current = current.parent
-    for parent in reversed(parent_chain):
-        breadcrumbs.append({'title': parent.name, 'url': reverse('category_or_product', kwargs={'slug': parent.slug})})
-    breadcrumbs.append({'title': product.category.name, 'url': reverse('category_or_product', kwargs={'slug': product.category.slug})})
+    breadcrumbs.extend(category_breadcrumbs(product.category))
     breadcrumbs.append({'title': product.name, 'url': product.get_absolute_url()})
     
     context = {
@@ -196,7 +189,8 @@ def product_detail_public(request, slug):
 
 def cart_view(request):
     # Cart is stored in session as {product_id: quantity}
-    cart = request.session.get('cart', {})
+    cart_service = get_cart_service(request)
+    cart = dict(cart_service.cart)
     message = None
     
     # Validate cart and get any change messages
@@ -206,10 +200,7 @@ def cart_view(request):
     if request.method == 'POST':
         product_id = request.POST.get('product_id')
         action = request.POST.get('action', 'add')
-        try:
-            product = Product.objects.get(pk=product_id, is_active=True)
-        except (Product.DoesNotExist, ValueError, TypeError):
-            product = None
+        product = cart_service.get_product(product_id) if product_id else None
         if product:
             # Convert product_id to string for consistency
             product_id_str = str(product_id)
@@ -249,27 +240,23 @@ def cart_view(request):
         
         # Validate entire cart after changes
         if request.user.is_authenticated:
-            cart, changes_made, change_messages = validate_and_clean_cart(request.user, cart)
+            cart, changes_made, change_messages, cart_items = cart_service.validate(cart)
             if change_messages:
                 cart_change_messages.extend(change_messages)
         
-        request.session['cart'] = cart
-        
-        # Sync cart to database for authenticated users
-        if request.user.is_authenticated:
-            save_cart_to_database(request.user, cart)
+        # Store in session and sync cart to database for authenticated users
+        cart_service.update(cart)
         
         return HttpResponseRedirect(reverse('cart_view'))
     
     # Validate cart on load for all users (but safely)
+    cart_items = None
     if cart:
         try:
-            cart, changes_made, change_messages = validate_and_clean_cart(request.user, cart)
+            cart, changes_made, change_messages, cart_items = cart_service.validate(cart)
             if changes_made:
-                request.session['cart'] = cart
-                # Save to database only for authenticated users
-                if request.user.is_authenticated:
-                    save_cart_to_database(request.user, cart)
+                # Store in session; saved to database only for authenticated users
+                cart_service.update(cart)
                 if change_messages:
                     cart_change_messages.extend(change_messages)
         except Exception as e:
@@ -278,22 +265,10 @@ def cart_view(request):
             # Keep the original cart if validation fails
             pass
     
-    # Prepare cart items for display
-    product_ids = list(cart.keys())
-    products = Product.objects.filter(id__in=product_ids, is_active=True)
-    cart_items = []
-    total = 0
-    for product in products:
-        qty = cart.get(str(product.id), 0)
-        price = product.discount_price or product.price
-        subtotal = price * qty
-        total += subtotal
-        cart_items.append({
-            'product': product,
-            'quantity': qty,
-            'price': price,
-            'subtotal': subtotal,
-        })
+    # Prepare cart items for display (already priced during validation)
+    if cart_items is None:
+        cart_items = cart_service.items
+    total = sum(item['subtotal'] for item in cart_items)
     
     context = {
         'cart_items': cart_items,
@@ -532,7 +507,13 @@ def checkout_step3_summary(request):
     payment_module = payment_modules.get(pm_code)
     payment_method_name = getattr(payment_module, 'display_name', pm_code.title()) if payment_module else pm_code
 
-    summary_form = OrderSummaryForm(request.POST or None)
+    # One order token per checkout; a replayed POST carries the same token
+    order_token = request.session.get('order_token')
+    if not order_token:
+        order_token = uuid.uuid4().hex
+        request.session['order_token'] = order_token
+    
+    summary_form = OrderSummaryForm(request.POST or None, initial={'order_token': order_token})
     if request.method == 'POST' and summary_form.is_valid():
         # Send required fields to place_order
         request.POST = request.POST.copy()
@@ -556,6 +537,13 @@ def checkout_step3_summary(request):
 def place_order(request):
     """Simple order placement with modular payment processing."""
     if request.method == 'POST':
+        # A replayed submission returns the order it already created
+        order_token = request.POST.get('order_token') or None
+        if order_token:
+            existing_order = Order.objects.filter(idempotency_key=order_token).first()
+            if existing_order:
+                return redirect('order_success', order_id=existing_order.id)
+        
         # Get cart items
         cart_items = get_cart_items(request)
         if not cart_items:
@@ -610,38 +598,76 @@ def place_order(request):
                 messages.error(request, error)
             return redirect('checkout_step2_shipping_payment')
         
+        # Reserve stock and create the order in one short transaction
+        try:
+            with transaction.atomic():
+                reserve_stock((item['product'].id, item['quantity']) for item in cart_items)
+                order = Order.objects.create(
+                    user=request.user if request.user.is_authenticated else None,
+                    shipping_address=None,  # No address for now
+                    billing_address=None,   # No address for now
+                    status='pending',
+                    payment_method_name=payment_method_code,
+                    payment_status='pending',
+                    total_amount=total,
+                    customer_name=customer_name,
+                    customer_email=customer_email,
+                    idempotency_key=order_token,
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product=item['product'],
+                        quantity=item['quantity'],
+                        price=item['price']
+                    )
+                    for item in cart_items
+                ])
+        except InsufficientStock:
+            messages.error(request, _('Some items in your cart are no longer available in the requested quantity.'))
+            return redirect('cart_view')
+        except IntegrityError:
+            # A concurrent duplicate submission created the order first
+            existing_order = Order.objects.filter(idempotency_key=order_token).first() if order_token else None
+            if existing_order:
+                return redirect('order_success', order_id=existing_order.id)
+            raise
+        
         # Process payment
+        payment_data['order'] = order
         payment_result = payment_module.process_payment(request, payment_data)
         
         if not payment_result.get('success'):
+            # Give the reserved stock back and allow a fresh attempt
+            release_order_stock(order)
+            Order.objects.filter(pk=order.pk).update(idempotency_key=None)
+            request.session.pop('order_token', None)
             messages.error(request, payment_result.get('message', 'Payment processing failed.'))
             return redirect('checkout_step2_shipping_payment')
         
-        # Create order with customer information
-        order = Order.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            shipping_address=None,  # No address for now
-            billing_address=None,   # No address for now
-            status='pending',
-            payment_method_name=payment_method_code,
-            payment_transaction_id=payment_result.get('transaction_id'),
-            payment_status=payment_result.get('status', 'pending'),
-            total_amount=total,
-            customer_name=customer_name,
-            customer_email=customer_email,
+        order.payment_transaction_id = (
+            payment_result.get('transaction_id') or payment_result.get('payment_intent_id') or ''
         )
-        
-        # Create order items
-        for item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                price=item['price']
+        order.payment_status = payment_result.get('status', 'pending')
+        order.save(update_fields=['payment_transaction_id', 'payment_status', 'updated_at'])
+        awaiting_payment = (
+            payment_result.get('awaiting_confirmation') and order.payment_status not in ('succeeded', 'paid')
+        )
+        if awaiting_payment:
+            # Paid online later (module webhook): give the stock back if the customer never completes it
+            expire_unpaid_order.delay(
+                order.id, _run_at=timezone.now() + timedelta(seconds=settings.ORDER_PAYMENT_TIMEOUT)
             )
         
-        # Clear cart
+        # Confirmation mail, notifications etc. run in the background; for payments
+        # still awaiting confirmation the payment module sends order_placed on success
+        if not awaiting_payment:
+            order_placed.send(sender=Order, order=order)
+        
+        # Clear cart and flush it to the database (write-behind)
         clear_cart(request)
+        flush_cart(request, force=True)
+        request.session.pop('order_token', None)
         
         # Show success message
         messages.success(request, payment_result.get('message', 'Order placed successfully!'))
@@ -721,11 +747,11 @@ def update_cart_ajax(request):
         # Convert product_id to string for consistency
         product_id_str = str(product_id)
         
-        cart = request.session.get('cart', {})
+        cart_service = get_cart_service(request)
+        cart = dict(cart_service.cart)
         
-        try:
-            product = Product.objects.get(pk=product_id, is_active=True)
-        except (Product.DoesNotExist, ValueError, TypeError):
+        product = cart_service.get_product(product_id) if product_id else None
+        if product is None:
             return JsonResponse({'success': False, 'error': 'Product not found'}, status=400)
         
         if action == 'update':
@@ -739,31 +765,22 @@ def update_cart_ajax(request):
         elif action == 'remove':
             cart.pop(product_id_str, None)
         
-        # Validate entire cart after changes
-        if request.user.is_authenticated:
-            cart, changes_made, change_messages = validate_and_clean_cart(request.user, cart)
-        
-        request.session['cart'] = cart
+        # Validate and price entire cart after changes
+        cart, changes_made, change_messages, priced_items = cart_service.validate(cart)
         
-        # Sync cart to database for authenticated users
-        if request.user.is_authenticated:
-            save_cart_to_database(request.user, cart)
+        # Store in session and sync cart to database for authenticated users
+        cart_service.update(cart)
         
-        # Recalculate cart totals
-        product_ids = list(cart.keys())
-        products = Product.objects.filter(id__in=product_ids, is_active=True)
+        # Cart totals from the priced lines
         cart_items = []
         total = 0
-        for product in products:
-            qty = cart.get(str(product.id), 0)
-            price = product.discount_price or product.price
-            subtotal = price * qty
-            total += subtotal
+        for item in priced_items:
+            total += item['subtotal']
             cart_items.append({
-                'product_id': product.id,
-                'quantity': qty,
-                'price': float(price),
-                'subtotal': float(subtotal),
+                'product_id': item['product'].id,
+                'quantity': item['quantity'],
+                'price': float(item['price']),
+                'subtotal': float(item['subtotal']),
             })
         
         return JsonResponse({
@@ -780,126 +797,182 @@ def update_cart_ajax(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+# Seconds a batch response stays replayable for its idempotency key
+CART_BATCH_IDEMPOTENCY_TTL = 300
+CART_BATCH_PENDING = 'pending'
+
+
+def serialize_cart_items(cart_items):
+    """Convert priced cart lines into JSON-friendly dicts. Returns (items, total)."""
+    items = []
+    total = 0
+    for item in cart_items:
+        product = item['product']
+        total += item['subtotal']
+        items.append({
+            'product_id': product.id,
+            'quantity': item['quantity'],
+            'price': float(item['price']),
+            'subtotal': float(item['subtotal']),
+            'name': product.name,
+            'stock': product.stock
+        })
+    return items, total
+
+
+def cart_batch_response(cart_service, cart_items, **extra):
+    """JSON response carrying the canonical cart state and server revision."""
+    items, total = serialize_cart_items(cart_items)
+    count = sum(item['quantity'] for item in items)
+    payload = {
+        'cart': {
+            'items': items,
+            'total': float(total),
+            'count': count
+        },
+        'server_rev': cart_service.revision,
+        'total': float(total),
+        'cart_count': count,
+    }
+    payload.update(extra)
+    return JsonResponse(payload, status=200 if payload.get('success') else 409)
+
+
 @require_POST
 @csrf_exempt
 def update_cart_batch(request):
-    """Batched cart operations endpoint - processes multiple operations in one request"""
+    """
+    Batched cart operations endpoint - processes multiple operations in one request.
+    
+    A batch may carry an idempotency key (Idempotency-Key header or
+    "idempotency_key" field); a retried batch is answered from a short-lived
+    response cache instead of being applied again. A batch based on a stale
+    "client_rev" is rejected with the canonical cart so the client can rebase.
+    """
+    cache_key = None
     try:
         data = json.loads(request.body)
         operations = data.get('ops', [])
-        client_rev = data.get('client_rev', 0)
+        client_rev = data.get('client_rev')
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         
         if not operations:
             return JsonResponse({'success': False, 'error': 'No operations provided'}, status=400)
         
-        cart = request.session.get('cart', {})
-        notices = []
+        cart_service = get_cart_service(request)
+        
+        if idempotency_key:
+            cache_key = f'cart_batch:{get_cart_storage(request).key}:{idempotency_key}'
+            if not cache.add(cache_key, CART_BATCH_PENDING, CART_BATCH_IDEMPOTENCY_TTL):
+                cached = cache.get(cache_key)
+                if cached and cached != CART_BATCH_PENDING:
+                    # Retried batch - replay the original response
+                    status, content = cached
+                    return HttpResponse(content, status=status, content_type='application/json')
+                # Same batch is still being applied by another request
+                return cart_batch_response(
+                    cart_service, cart_service.items,
+                    success=False, conflict=True, in_progress=True,
+                    error=_('This cart update is already being processed')
+                )
+        
+        if client_rev is not None and int(client_rev) != cart_service.revision:
+            # Cart changed elsewhere (another tab/device) - return canonical cart
+            response = cart_batch_response(
+                cart_service, cart_service.items,
+                success=False, conflict=True,
+                error=_('Your cart was changed in another window')
+            )
+        else:
+            response = apply_cart_batch(request, cart_service, operations)
         
-        # Process all operations in one transaction
-        with transaction.atomic():
-            # Get all affected products in one query
-            product_ids = [str(op.get('product_id')) for op in operations if op.get('product_id')]
-            products = {str(p.id): p for p in Product.objects.filter(id__in=product_ids, is_active=True)}
+        if cache_key:
+            cache.set(cache_key, (response.status_code, response.content), CART_BATCH_IDEMPOTENCY_TTL)
+        return response
+        
+    except (json.JSONDecodeError, ValueError) as e:
+        if cache_key:
+            cache.delete(cache_key)
+        return JsonResponse({'success': False, 'error': _('Invalid data format')}, status=400)
+    except Exception as e:
+        if cache_key:
+            cache.delete(cache_key)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def apply_cart_batch(request, cart_service, operations):
+    """Apply batch operations to the session cart and return the canonical cart response."""
+    cart = dict(cart_service.cart)
+    notices = []
+    
+    # Process all operations in one transaction
+    with transaction.atomic():
+        # Get all affected products (and the rest of the cart) in one query
+        product_ids = [str(op.get('product_id')) for op in operations if op.get('product_id')]
+        products = cart_service.get_products(product_ids)
+        
+        for op in operations:
+            product_id = str(op.get('product_id'))
+            action = op.get('action', 'update')
             
-            for op in operations:
-                product_id = str(op.get('product_id'))
-                action = op.get('action', 'update')
-                
-                # Skip if product doesn't exist
-                if product_id not in products:
-                    notices.append({
-                        'product_id': product_id,
-                        'type': 'error',
-                        'message': _('Product not found')
-                    })
-                    continue
-                
-                product = products[product_id]
+            # Skip if product doesn't exist
+            if product_id not in products:
+                notices.append({
+                    'product_id': product_id,
+                    'type': 'error',
+                    'message': _('Product not found')
+                })
+                continue
+            
+            product = products[product_id]
+            
+            if action == 'update':
+                quantity = int(op.get('quantity', 1))
                 
-                if action == 'update':
-                    quantity = int(op.get('quantity', 1))
-                    
-                    if quantity > 0:
-                        # Validate quantity against stock
-                        original_qty = quantity
-                        if quantity > product.stock:
-                            quantity = product.stock
-                            notices.append({
-                                'product_id': product_id,
-                                'type': 'stock_adjustment',
-                                'message': _('Quantity adjusted to available stock: %(stock)s') % {'stock': product.stock},
-                                'adjusted_quantity': quantity
-                            })
-                        
-                        cart[product_id] = quantity
-                    else:
-                        # Remove if quantity is 0 or negative
-                        cart.pop(product_id, None)
+                if quantity > 0:
+                    # Validate quantity against stock
+                    original_qty = quantity
+                    if quantity > product.stock:
+                        quantity = product.stock
                         notices.append({
                             'product_id': product_id,
-                            'type': 'removed',
-                            'message': _('Item removed from cart')
+                            'type': 'stock_adjustment',
+                            'message': _('Quantity adjusted to available stock: %(stock)s') % {'stock': product.stock},
+                            'adjusted_quantity': quantity
                         })
-                
-                elif action == 'remove':
+                    
+                    cart[product_id] = quantity
+                else:
+                    # Remove if quantity is 0 or negative
                     cart.pop(product_id, None)
                     notices.append({
                         'product_id': product_id,
                         'type': 'removed',
                         'message': _('Item removed from cart')
                     })
-        
-        # Validate entire cart after all changes
-        if request.user.is_authenticated:
-            cart, changes_made, change_messages = validate_and_clean_cart(request.user, cart)
-            if change_messages:
-                for msg in change_messages:
-                    notices.append({
-                        'type': 'validation',
-                        'message': str(msg)
-                    })
-        
-        request.session['cart'] = cart
-        
-        # Sync cart to database for authenticated users
-        if request.user.is_authenticated:
-            save_cart_to_database(request.user, cart)
-        
-        # Prepare response with canonical cart state
-        product_ids = list(cart.keys())
-        products = Product.objects.filter(id__in=product_ids, is_active=True)
-        cart_items = []
-        total = 0
-        
-        for product in products:
-            qty = cart.get(str(product.id), 0)
-            price = product.discount_price or product.price
-            subtotal = price * qty
-            total += subtotal
-            cart_items.append({
-                'product_id': product.id,
-                'quantity': qty,
-                'price': float(price),
-                'subtotal': float(subtotal),
-                'name': product.name,
-                'stock': product.stock
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'cart': {
-                'items': cart_items,
-                'total': float(total),
-                'count': sum(cart.values())
-            },
-            'server_rev': client_rev + 1,
-            'notices': notices,
-            'total': float(total),
-            'cart_count': sum(cart.values()),
-            'message': _('Cart updated successfully')
+            
+            elif action == 'remove':
+                cart.pop(product_id, None)
+                notices.append({
+                    'product_id': product_id,
+                    'type': 'removed',
+                    'message': _('Item removed from cart')
+                })
+    
+    # Validate and price entire cart after all changes
+    cart, changes_made, change_messages, priced_items = cart_service.validate(cart)
+    for msg in change_messages:
+        notices.append({
+            'type': 'validation',
+            'message': str(msg)
         })
-        
-    except (json.JSONDecodeError, ValueError) as e:
-        return JsonResponse({'success': False, 'error': _('Invalid data format')}, status=400)
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    
+    # Store in session and sync cart to database for authenticated users
+    cart_service.update(cart)
+    
+    return cart_batch_response(
+        cart_service, priced_items,
+        success=True,
+        notices=notices,
+        message=_('Cart updated successfully')
+    )
@@ -4,7 +4,8 @@
  * Features:
  * - Optimistic UI updates (instant feedback)
  * - Debounced batching (reduces server requests)
- * - Conflict resolution (handles stock adjustments)
+ * - Conflict resolution (handles stock adjustments and stale cart revisions)
+ * - Idempotency keys (retried batches are not applied twice)
  * - AbortController support (cancels stale requests)
  */
 
@@ -13,7 +14,9 @@ class CartManager {
         this.operationQueue = [];
         this.isProcessing = false;
         this.abortController = null;
-        this.clientRev = 0;
+        this.clientRev = this.readInitialRevision();
+        this.retryKey = null;
+        this.retryCount = 0;
         this.flushTimeout = null;
         
         // Configuration
@@ -26,6 +29,16 @@ class CartManager {
         this.initializeEventHandlers();
     }
     
+    /**
+     * Cart revision rendered into the page, so the first batch is conflict-checked too
+     * @returns {number|null}
+     */
+    readInitialRevision() {
+        const meta = document.querySelector('meta[name="cart-rev"]');
+        const rev = meta ? parseInt(meta.content, 10) : NaN;
+        return Number.isNaN(rev) ? null : rev;
+    }
+    
     /**
      * Initialize event handlers for cart interactions
      */
@@ -99,6 +112,10 @@ class CartManager {
     queueOperation(operation) {
         const productId = operation.product_id;
         
+        // New operations start a new batch - don't reuse a retry key
+        this.retryKey = null;
+        this.retryCount = 0;
+        
         // Remove any existing operation for this product (latest wins)
         this.operationQueue = this.operationQueue.filter(op => op.product_id !== productId);
         
@@ -108,8 +125,9 @@ class CartManager {
     
     /**
      * Schedule a flush with debouncing
+     * @param {number} [delay] - defaults to the debounce interval
      */
-    scheduleFlush() {
+    scheduleFlush(delay = this.config.debounceMs) {
         // Clear existing timeout
         if (this.flushTimeout) {
             clearTimeout(this.flushTimeout);
@@ -118,7 +136,27 @@ class CartManager {
         // Schedule new flush
         this.flushTimeout = setTimeout(() => {
             this.flush();
-        }, this.config.debounceMs);
+        }, delay);
+    }
+    
+    /**
+     * Put a failed batch back in front of the queue and retry it with backoff
+     * @param {Array} operations
+     * @param {string} idempotencyKey
+     */
+    retryBatch(operations, idempotencyKey) {
+        const unchanged = this.operationQueue.length === 0;
+        this.operationQueue = [...operations, ...this.operationQueue];
+        // Retry the same batch with the same key so it is not applied twice
+        if (unchanged) {
+            this.retryKey = idempotencyKey;
+        }
+        this.retryCount += 1;
+        if (this.retryCount > this.config.maxRetries) {
+            this.retryCount = 0;
+            this.showNotification('Connection error. Your changes may not be saved.', 'warning');
+        }
+        this.scheduleFlush(this.config.debounceMs * 2 ** this.retryCount);
     }
     
     /**
@@ -136,7 +174,9 @@ class CartManager {
         this.abortController = new AbortController();
         
         const operations = [...this.operationQueue];
+        const idempotencyKey = this.retryKey || this.generateIdempotencyKey();
         this.operationQueue = [];
+        this.retryKey = null;
         this.isProcessing = true;
         
         try {
@@ -144,7 +184,8 @@ class CartManager {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'X-CSRFToken': this.getCsrfToken()
+                    'X-CSRFToken': this.getCsrfToken(),
+                    'Idempotency-Key': idempotencyKey
                 },
                 body: JSON.stringify({
                     ops: operations,
@@ -153,6 +194,22 @@ class CartManager {
                 signal: this.abortController.signal
             });
             
+            if (response.status === 409) {
+                // Cart changed elsewhere - rebase on the canonical cart
+                const data = await response.json();
+                this.clientRev = data.server_rev;
+                this.reconcileUI(data);
+                if (data.in_progress) {
+                    // The same batch is still being applied - retry it later
+                    // with the same key to get its result
+                    this.retryBatch(operations, idempotencyKey);
+                } else {
+                    this.operationQueue = [...operations, ...this.operationQueue];
+                    this.scheduleFlush();
+                }
+                return;
+            }
+            
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
@@ -160,6 +217,7 @@ class CartManager {
             const data = await response.json();
             
             if (data.success) {
+                this.retryCount = 0;
                 this.clientRev = data.server_rev;
                 this.reconcileUI(data);
             } else {
@@ -172,15 +230,25 @@ class CartManager {
                 console.error('Cart sync failed:', error);
                 this.showNotification('Connection error. Your changes may not be saved.', 'warning');
                 
-                // Re-queue operations for retry (simple strategy)
-                this.operationQueue = [...operations, ...this.operationQueue];
-                this.scheduleFlush();
+                // Re-queue operations for retry
+                this.retryBatch(operations, idempotencyKey);
             }
         } finally {
             this.isProcessing = false;
         }
     }
     
+    /**
+     * Generate a unique idempotency key for a batch
+     * @returns {string}
+     */
+    generateIdempotencyKey() {
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+            return window.crypto.randomUUID();
+        }
+        return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+    
     /**
      * Update UI immediately for optimistic feedback
      * @param {string} productId 